@@ -1,14 +1,14 @@
 from fpdf import FPDF
-import os
+from fpdf_utils import add_unicode_font, finish_pdf
+from paper_model import question_parts
 
 def create_answer_sheet_pdf(
-    paper_name, questions_by_section, output_path,
+    paper_name, questions_by_section, output_path=None,
     school_name=None, exam_name=None, class_name=None, subject=None, time=None, max_marks=None
 ):
     pdf = FPDF()
     pdf.add_page()
-    font_path_math = os.path.join(os.path.dirname(__file__), "NotoSansMath-Regular.ttf")
-    pdf.add_font('NotoSansMath', '', font_path_math, uni=True)
+    add_unicode_font(pdf)
     pdf.set_font('NotoSansMath', '', 14)
     margin = 15
     page_width = pdf.w - 2 * margin
@@ -45,17 +45,11 @@ def create_answer_sheet_pdf(
         pdf.cell(page_width, 10, txt=section_name, ln=True, align='C')
         pdf.set_font('NotoSansMath', '', 12)
         for idx, q in enumerate(questions, 1):
-            q_text = q.get('text', '')
-            # Extract answer if present
-            answer = ''
-            for line in q_text.split('\n'):
-                if line.strip().lower().startswith('answer:'):
-                    answer = line.strip()
+            answer = question_parts(q)["answer"]
             if answer:
-                pdf.multi_cell(page_width, 8, f"Q{idx}: {answer}", align='L')
+                pdf.multi_cell(page_width, 8, f"Q{idx}: Answer: {answer}", align='L')
             else:
                 pdf.multi_cell(page_width, 8, f"Q{idx}: [No answer found]", align='L')
             pdf.ln(2)
         pdf.ln(6)
-    pdf.output(output_path)
-    return output_path
+    return finish_pdf(pdf, output_path)
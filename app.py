@@ -1,50 +1,70 @@
+import time as time_module
+_import_started = time_module.perf_counter()
 import streamlit as st
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import google.generativeai as genai
-from langchain.vectorstores import Chroma
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.question_answering import load_qa_chain
-from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
-from question_paper_template import create_question_paper_pdf
-from answer_sheet_template import create_answer_sheet_pdf
-import tempfile
+from render_pipeline import render_paper
+from paper_variants import render_variants, variants_zip
+from paper_generator import generate_paper_sections, get_corpus, get_text_chunks
+from vector_index import index_chunks
+from lexical_index import build_lexical_index
+from retrieval import hybrid_search
+from corpus_store import corpus_path, registry
+from resources import get_chat_model, get_corpus_store, get_embeddings, get_resource
+from llm_cache import get_response_cache, model_signature, response_key, stream_text
+from job_queue import job_manager
+from upload_store import upload_store
+from tracing import record_span, recent_traces, set_session, span, trace_totals
+import hashlib
+import json
+import uuid
 
 load_dotenv()
-os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# langchain, chromadb and the Gemini SDK are imported on first use, not here
+get_resource("startup_imports", lambda: record_span("startup.imports", time_module.perf_counter() - _import_started))
 
 
 
 
 
 
-def get_pdf_text(pdf_docs):
-    text=""
-    for pdf in pdf_docs:
-        pdf_reader= PdfReader(pdf)
-        for page in pdf_reader.pages:
-            text+= page.extract_text()
-    return  text
+def get_vector_store(text_chunks, corpus):
+    with span("index", chunks=len(text_chunks)) as stage:
+        # The BM25 index needs no API calls, so chat can answer from it right away
+        build_lexical_index(corpus, text_chunks)
+        vector_store = get_corpus_store(corpus)
+        # Only chunks not already in the store are embedded
+        stage.set(embed_calls=index_chunks(vector_store, text_chunks, get_embeddings()))
+        vector_store.persist()
 
 
+def store_uploads(pdf_docs):
+    """Spill uploads to the shared on-disk store; the session keeps only their hashes."""
+    stored = st.session_state.setdefault('upload_digests', {})
+    digests = []
+    for pdf in pdf_docs or []:
+        upload_key = getattr(pdf, 'file_id', None) or f"{pdf.name}:{pdf.size}"
+        if upload_key not in stored or not os.path.exists(upload_store.path(stored[upload_key])):
+            stored[upload_key] = upload_store.put(pdf)
+        digests.append(stored[upload_key])
+    return digests
 
-def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
-    chunks = text_splitter.split_text(text)
-    return chunks
 
+def process_uploads(digests):
+    with span("process_uploads", files=len(digests)):
+        with upload_store.pinned(digests):
+            corpus, raw_text = get_corpus(upload_store.paths(digests))
+        # Claimed before indexing, so another session's eviction cannot remove it mid-build
+        registry.acquire(corpus, st.session_state['session_id'])
+        text_chunks = get_text_chunks(raw_text)
+        get_vector_store(text_chunks, corpus)
+    # Scope this session to the new corpus and drop collections nobody uses
+    st.session_state['corpus_id'] = corpus
+    registry.evict()
 
-def get_vector_store(text_chunks):
-    embeddings = GoogleGenerativeAIEmbeddings(model = "models/embedding-001")
-    vector_store = Chroma.from_texts(text_chunks, embedding=embeddings, persist_directory="chroma_db")
-    vector_store.persist()
 
-
-def get_conversational_chain():
+def get_conversational_prompt():
+    from langchain.prompts import PromptTemplate
 
     prompt_template = """
     Answer the question as detailed as possible from the provided context, make sure to provide all the details, if the answer is not in
@@ -55,78 +75,96 @@ def get_conversational_chain():
     Answer:
     """
 
-    model = ChatGoogleGenerativeAI(model="gemini-2.0-flash",
-                             temperature=0.3)
-
-    prompt = PromptTemplate(template = prompt_template, input_variables = ["context", "question"])
-    chain = load_qa_chain(model, chain_type="stuff", prompt=prompt)
-
-    return chain
-
-
-
-def user_input(user_question):
-    embeddings = GoogleGenerativeAIEmbeddings(model = "models/embedding-001")
-    new_db = Chroma(persist_directory="chroma_db", embedding_function=embeddings)
-    docs = new_db.similarity_search(user_question)
-    chain = get_conversational_chain()
-    response = chain(
-        {"input_documents":docs, "question": user_question}
-        , return_only_outputs=True)
-    print(response)
-    st.write("Reply: ", response["output_text"])
-
-def generate_questions_from_pdf(pdf_docs, num_questions, output_format, difficulty, total_marks, paper_name):
-    raw_text = get_pdf_text(pdf_docs)
-    if output_format == "MCQ":
-        format_instruction = f"Generate {num_questions} multiple choice questions (MCQ) with 4 options each (A, B, C, D). For each question, list the options clearly and indicate the correct answer at the end in the format: 'Answer: <option letter>'. "
-    elif output_format == "Short":
-        format_instruction = f"Generate {num_questions} short answer questions."
-    elif output_format == "Long":
-        format_instruction = f"Generate {num_questions} long answer questions."
-    else:
-        format_instruction = f"Generate {num_questions} questions."
-    prompt = f"""
-    You are an expert exam paper generator. {format_instruction}
-    Difficulty: {difficulty if difficulty != 'Any' else 'Mixed'}
-    Total Marks/Duration: {total_marks if total_marks else 'Not specified'}
-    Paper Name: {paper_name}
-    
-    Document Content:
-    {raw_text}
-    
-    Output only the questions, clearly numbered. For MCQ, provide options A, B, C, D for each question, and indicate the correct answer as 'Answer: <option letter>'.
-    """
-    model = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.3)
-    response = model.invoke(prompt)
-    if hasattr(response, 'content'):
-        response_text = response.content
-    else:
-        response_text = str(response)
-    # For MCQ, group question, options, and answer together
-    if output_format == "MCQ":
-        questions = []
-        lines = response_text.split('\n')
-        current_q = []
-        for line in lines:
-            if line.strip().startswith(('Q', '1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.')) and current_q:
-                questions.append('\n'.join(current_q).strip())
-                current_q = [line]
-            else:
-                current_q.append(line)
-        if current_q:
-            questions.append('\n'.join(current_q).strip())
-    else:
-        questions = [q.strip() for q in response_text.split('\n') if q.strip() and (q.strip().startswith('Q') or q.strip()[0].isdigit())]
-        if not questions:
-            questions = response_text.split('\n')
-    return questions
+    return PromptTemplate(template = prompt_template, input_variables = ["context", "question"])
+
+
+
+def user_input(user_question, use_cache=True):
+    corpus = st.session_state.get('corpus_id')
+    if not corpus or not os.path.isdir(corpus_path(corpus)):
+        st.warning("Please upload your PDF files and click \"Submit & Process\" first.")
+        return
+    registry.acquire(corpus, st.session_state['session_id'])
+    with span("chat") as stage:
+        # A cached reply skips both the embedding call and the chat call
+        cache = get_response_cache()
+        model = get_chat_model()
+        key = response_key(corpus, f"qa:{user_question}", *model_signature(model))
+        output_text = cache.get(key) if use_cache else None
+        stage.set(cache_hit=output_text is not None)
+        if output_text is not None:
+            st.write("Reply: ", output_text)
+            return
+        # BM25 and vector results are fused; BM25 alone answers if embeddings are slow
+        chunks = hybrid_search(user_question, corpus)
+        prompt = get_resource("qa_prompt", get_conversational_prompt).format(
+            context="\n\n".join(chunks), question=user_question)
+        st.write("Reply: ")
+        # Show the reply token by token instead of waiting for the whole answer
+        output_text = st.write_stream(stream_text(model, prompt))
+        cache.put(key, output_text)
+
+
+def paper_job_key(session_id, digests, section_data, header, options):
+    # Per session, so one teacher cancelling a job never cancels another's identical paper
+    payload = json.dumps([session_id, digests, section_data, header, options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def run_paper_job(job, digests, section_data, header, use_cache, avoid_repeats):
+    with span("paper_job", sections=len(section_data)):
+        return _run_paper_job(job, digests, section_data, header, use_cache, avoid_repeats)
+
+
+def _run_paper_job(job, digests, section_data, header, use_cache, avoid_repeats):
+    job.set_progress(done=0, total=len(section_data) + 1, message="Generating questions")
+    with upload_store.pinned(digests):
+        generate_paper_sections(
+            upload_store.paths(digests), section_data, use_cache=use_cache,
+            on_section_done=lambda idx, section: job.advance(f"Generated {section['section_name']}"),
+            cancel_event=job.cancel_event,
+            on_question=lambda s_idx, q_idx, text: job.set_partial((s_idx, q_idx), text),
+            avoid_repeats=avoid_repeats
+        )
+    job.check_cancelled()
+    job.set_progress(message="Rendering files")
+    # Render all three files in memory, once per generation
+    paper_files = render_paper(section_data, **header)
+    job.advance("Done")
+    return {"files": paper_files, "section_data": section_data}
+
 
 
+def show_debug_panel():
+    # Only this session's traces; other teachers' chats and papers are not shown
+    traces = recent_traces(limit=5, session_id=st.session_state['session_id'])
+    if not traces:
+        st.caption("No timings recorded yet.")
+        return
+    for trace in traces:
+        root = trace[0][1]
+        totals = trace_totals(trace)
+        with st.expander(f"{root.name}: {root.duration:.2f}s, {totals['prompt_tokens']} + {totals['response_tokens']} tokens"):
+            st.caption(f"{totals['llm_calls']} LLM calls, {totals['cache_hits']} cache hits, {totals['retries']} retries")
+            st.dataframe([
+                {
+                    "span": "· " * depth + item.name,
+                    "ms": round(item.duration * 1000, 1),
+                    "prompt tokens": item.attrs.get("prompt_tokens"),
+                    "response tokens": item.attrs.get("response_tokens"),
+                    "cache hit": item.attrs.get("cache_hit"),
+                    "error": item.error,
+                }
+                for depth, item in trace
+            ], hide_index=True)
+
 
 def main():
     st.set_page_config("Chat PDF")
     st.header("Chat with PDF using Gemini💁")
+    if 'session_id' not in st.session_state:
+        st.session_state['session_id'] = uuid.uuid4().hex
+    set_session(st.session_state['session_id'])
 
     with st.sidebar:
         st.title("Menu:")
@@ -135,22 +173,23 @@ def main():
         if menu_option == "Chat with PDF":
             if st.button("Submit & Process"):
                 with st.spinner("Processing..."):
-                    raw_text = get_pdf_text(pdf_docs)
-                    text_chunks = get_text_chunks(raw_text)
-                    get_vector_store(text_chunks)
+                    process_uploads(store_uploads(pdf_docs))
                     st.success("Done")
         elif menu_option == "Generate Question Paper":
             if st.button("Submit & Process"):
                 with st.spinner("Processing..."):
-                    raw_text = get_pdf_text(pdf_docs)
-                    text_chunks = get_text_chunks(raw_text)
-                    get_vector_store(text_chunks)
+                    process_uploads(store_uploads(pdf_docs))
                     st.success("Done")
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        if st.checkbox("Show debug timings", key="debug_timings"):
+            show_debug_panel()
 
     if menu_option == "Chat with PDF":
         user_question = st.text_input("Ask a Question from the PDF Files")
+        force_fresh = st.checkbox("Bypass cache (force fresh answer)", key="chat_force_fresh")
         if user_question:
-            user_input(user_question)
+            user_input(user_question, use_cache=not force_fresh)
 
     elif menu_option == "Generate Question Paper":
         st.subheader("Generate Question Paper from PDF")
@@ -173,14 +212,20 @@ def main():
                 num_questions = st.number_input(f"Number of Questions in Section {chr(65+i)}", min_value=1, max_value=20, value=st.session_state.get(f'reset_num_questions_{i}', 2), key=f"num_questions_{i}")
                 q_type = st.selectbox(f"Question Type for Section {chr(65+i)}", ["MCQ", "Short", "Long"], index=["MCQ", "Short", "Long"].index(st.session_state.get(f'reset_qtype_{i}', "MCQ")), key=f"qtype_{i}")
                 q_marks = st.text_input(f"Marks per Question in Section {chr(65+i)}", value=st.session_state.get(f'reset_qmarks_{i}', ''), key=f"qmarks_{i}")
+                topic = st.text_input(f"Topic for Section {chr(65+i)} (optional)", value=st.session_state.get(f'reset_topic_{i}', ''), key=f"topic_{i}")
+                from_bank = st.checkbox(f"Fill Section {chr(65+i)} from unused question bank questions first", key=f"bank_{i}")
                 section_data.append({
                     "section_name": section_name,
+                    "topic": topic,
+                    "from_bank": from_bank,
                     "section_marks": section_marks,
                     "num_questions": int(num_questions),
                     "q_type": q_type,
                     "q_marks": q_marks,
                     "questions": []
                 })
+            avoid_repeats = st.checkbox("Avoid questions used in earlier papers", key="avoid_repeats")
+            force_fresh = st.checkbox("Bypass cache (force fresh generation)", key="force_fresh")
             col1, col2 = st.columns([1,1])
             with col1:
                 generate_btn = st.form_submit_button("Generate Paper")
@@ -188,12 +233,14 @@ def main():
                 reset_btn = st.form_submit_button("Reset")
         if reset_btn:
             for k in list(st.session_state.keys()):
-                if k.startswith('reset_') or k.startswith('section_name_') or k.startswith('section_marks_') or k.startswith('num_questions_') or k.startswith('qtype_') or k.startswith('qmarks_') or k == 'num_sections':
+                if k.startswith('reset_') or k.startswith('section_name_') or k.startswith('section_marks_') or k.startswith('num_questions_') or k.startswith('qtype_') or k.startswith('qmarks_') or k.startswith('topic_') or k.startswith('bank_') or k == 'num_sections':
                     del st.session_state[k]
             st.session_state['show_download_buttons'] = False
             st.experimental_rerun()
         if generate_btn and pdf_docs:
-            st.session_state['show_download_buttons'] = True
+            pdf_digests = store_uploads(pdf_docs)
+            st.session_state['show_download_buttons'] = False
+            st.session_state.pop('paper_sets_zip', None)
             st.session_state['last_qp_args'] = {
                 'exam_name': exam_name,
                 'section_data': section_data,
@@ -203,103 +250,83 @@ def main():
                 'subject': subject,
                 'time': time,
                 'notes': notes,
-                'pdf_docs': pdf_docs
+                'pdf_digests': pdf_digests
             }
-            # Generate and save PDFs and DOCX only once per generation
-            import tempfile, uuid, os
-            unique_id = str(uuid.uuid4())
-            base_dir = os.path.join(tempfile.gettempdir(), 'papermaker')
-            os.makedirs(base_dir, exist_ok=True)
-            pdf_path = os.path.join(base_dir, f"{unique_id}_question_paper.pdf")
-            ans_path = os.path.join(base_dir, f"{unique_id}_answer_sheet.pdf")
-            docx_path = os.path.join(base_dir, f"{unique_id}_question_paper.docx")
-            # Generate questions for each section
-            for section in section_data:
-                questions = generate_questions_from_pdf(
-                    pdf_docs,
-                    section["num_questions"],
-                    section["q_type"],
-                    '', '', ''
-                )
-                section["questions"] = [
-                    {"text": q, "marks": section["q_marks"], "type": section["q_type"]}
-                    for q in questions
-                ]
-            # Generate files
-            create_question_paper_pdf(
-                paper_name=exam_name,
-                questions_by_section=section_data,
-                total_marks=max_marks,
-                output_path=pdf_path,
-                school_name=school_name,
-                exam_name=exam_name,
-                class_name=class_name,
-                subject=subject,
-                time=time,
-                notes=notes,
-                max_marks=max_marks
-            )
-            create_answer_sheet_pdf(
-                paper_name=exam_name,
-                questions_by_section=section_data,
-                output_path=ans_path,
-                school_name=school_name,
-                exam_name=exam_name,
-                class_name=class_name,
-                subject=subject,
-                time=time,
-                max_marks=max_marks
-            )
-            import docx
-            def create_question_paper_docx(paper_name, questions_by_section, total_marks, output_path, school_name, exam_name, class_name, subject, time, notes, max_marks):
-                doc = docx.Document()
-                doc.add_heading(school_name, 0)
-                doc.add_paragraph(f"Exam: {exam_name}")
-                doc.add_paragraph(f"Class: {class_name}")
-                doc.add_paragraph(f"Subject: {subject}")
-                doc.add_paragraph(f"Time: {time}")
-                doc.add_paragraph(f"Maximum Marks: {max_marks}")
-                if notes:
-                    doc.add_paragraph("Notes:")
-                    for note in notes:
-                        doc.add_paragraph(note, style='List Bullet')
-                for section in questions_by_section:
-                    doc.add_heading(section['section_name'], level=1)
-                    for idx, q in enumerate(section['questions']):
-                        para = doc.add_paragraph()
-                        para.add_run(f"Q{idx+1}. {q['text']}").bold = False
-                        para.add_run(f"   [{q['marks']} marks]").italic = True
-                doc.save(output_path)
-                return output_path
-            create_question_paper_docx(
-                paper_name=exam_name,
-                questions_by_section=section_data,
-                total_marks=max_marks,
-                output_path=docx_path,
-                school_name=school_name,
-                exam_name=exam_name,
-                class_name=class_name,
-                subject=subject,
-                time=time,
-                notes=notes,
-                max_marks=max_marks
+            header = {
+                'exam_name': exam_name,
+                'school_name': school_name,
+                'class_name': class_name,
+                'subject': subject,
+                'time': time,
+                'notes': notes,
+                'max_marks': max_marks
+            }
+            # Generation runs on a background worker so reruns don't interrupt or repeat it
+            job = job_manager.submit(
+                run_paper_job, pdf_digests, section_data, header, not force_fresh, avoid_repeats,
+                key=paper_job_key(st.session_state['session_id'], pdf_digests, section_data, header,
+                                  [force_fresh, avoid_repeats])
             )
-            st.session_state['qp_pdf_path'] = pdf_path
-            st.session_state['ans_pdf_path'] = ans_path
-            st.session_state['preview_docx_path'] = docx_path
-        # Use saved files for download/preview
-        if st.session_state.get('show_download_buttons', False):
-            pdf_path = st.session_state.get('qp_pdf_path')
-            ans_path = st.session_state.get('ans_pdf_path')
-            docx_path = st.session_state.get('preview_docx_path')
+            st.session_state['paper_job_id'] = job.id
+        job = job_manager.get(st.session_state.get('paper_job_id'))
+        if job is not None:
+            if not job.finished:
+                st.progress(job.fraction, text=job.message)
+                if st.button("Cancel", key="cancel_job_btn"):
+                    job.cancel()
+                # Questions appear as soon as the model finishes writing them
+                section_names = [section['section_name'] for section in st.session_state['last_qp_args']['section_data']]
+                current_section = None
+                for (s_idx, q_idx), text in job.partial_items():
+                    if s_idx != current_section:
+                        current_section = s_idx
+                        st.markdown(f"**{section_names[s_idx]}**")
+                    st.text(text)
+                time_module.sleep(1)
+                st.rerun()
+            del st.session_state['paper_job_id']
+            if job.status == "done":
+                st.session_state['paper_files'] = job.result['files']
+                st.session_state['paper_sections'] = job.result['section_data']
+                st.session_state['preview_docx_bytes'] = job.result['files']['docx']
+                st.session_state['show_download_buttons'] = True
+            elif job.status == "failed":
+                st.error(f"Paper generation failed: {job.error}")
+            else:
+                st.info("Paper generation was cancelled.")
+        # Use rendered files for download/preview
+        if st.session_state.get('show_download_buttons', False) and 'paper_files' in st.session_state:
+            paper_files = st.session_state['paper_files']
+            exam_title = st.session_state['last_qp_args']['exam_name']
             st.markdown("#### Preview and Download")
-            with open(pdf_path, "rb") as f:
-                st.download_button("Download Question Paper", f, file_name=f"{st.session_state['last_qp_args']['exam_name'] or 'QuestionPaper'}.pdf", mime="application/pdf", key="download_qp_btn")
-            with open(ans_path, "rb") as f:
-                st.download_button("Download Answers", f, file_name=f"{st.session_state['last_qp_args']['exam_name'] or 'Answers'}.pdf", mime="application/pdf", key="download_ans_btn")
+            for section in st.session_state.get('paper_sections', []):
+                if section.get('shortfall'):
+                    st.warning(f"{section['section_name']}: only {len(section['questions'])} of {section['num_questions']} questions could be generated. Try regenerating or lowering the count.")
+            st.download_button("Download Question Paper", paper_files['question_paper'], file_name=f"{exam_title or 'QuestionPaper'}.pdf", mime="application/pdf", key="download_qp_btn")
+            st.download_button("Download Answers", paper_files['answer_sheet'], file_name=f"{exam_title or 'Answers'}.pdf", mime="application/pdf", key="download_ans_btn")
+            st.download_button("Download Word", paper_files['docx'], file_name=f"{exam_title or 'QuestionPaper'}.docx", mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document", key="download_docx_btn")
+            st.markdown("#### Extra Sets")
+            set_col1, set_col2 = st.columns([1,1])
+            with set_col1:
+                num_sets = st.number_input("Number of sets", min_value=2, max_value=100, value=3, step=1, key="num_sets")
+            with set_col2:
+                set_seed = st.number_input("Shuffle seed", min_value=0, value=0, step=1, key="set_seed")
+            if st.button("Generate Sets", key="generate_sets_btn"):
+                # Shuffles the questions already generated; no model calls
+                last_args = st.session_state['last_qp_args']
+                with st.spinner(f"Rendering {int(num_sets)} sets..."):
+                    variants = render_variants(
+                        st.session_state['paper_sections'], int(num_sets), seed=int(set_seed),
+                        exam_name=last_args['exam_name'], school_name=last_args['school_name'],
+                        class_name=last_args['class_name'], subject=last_args['subject'],
+                        time=last_args['time'], notes=last_args['notes'], max_marks=last_args['max_marks']
+                    )
+                    st.session_state['paper_sets_zip'] = variants_zip(variants, exam_title or 'QuestionPaper')
+            if 'paper_sets_zip' in st.session_state:
+                st.download_button("Download Sets (zip)", st.session_state['paper_sets_zip'], file_name=f"{exam_title or 'QuestionPaper'} Sets.zip", mime="application/zip", key="download_sets_btn")
             if st.button("Reset", key="reset_btn"):
                 st.session_state['show_download_buttons'] = False
-                for k in ['qp_pdf_path', 'ans_pdf_path', 'preview_docx_path', 'last_qp_args']:
+                for k in ['paper_files', 'paper_sections', 'paper_sets_zip', 'preview_docx_bytes', 'last_qp_args', 'paper_job_id']:
                     if k in st.session_state:
                         del st.session_state[k]
 
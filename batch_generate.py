@@ -0,0 +1,219 @@
+"""Generate many question papers from a manifest without the Streamlit UI.
+
+Usage:
+    python batch_generate.py manifest.yaml --output-dir papers --workers 4 --rpm 60
+
+The manifest (YAML or JSON) has optional ``defaults`` merged into every
+entry of ``papers``:
+
+    defaults:
+      school_name: Springfield High
+      time: 3 Hours
+    papers:
+      - id: class10-science
+        pdfs: [books/science10.pdf]
+        exam_name: Term 1
+        class_name: "10"
+        subject: Science
+        max_marks: "80"
+        notes: [All questions are compulsory]
+        avoid_repeats: true        # skip questions used in earlier papers
+        sets: 3                    # also write shuffled Set A/B/C papers
+        seed: 42                   # shuffle seed for the sets (default 0)
+        sections:
+          - section_name: Section A
+            num_questions: 10
+            q_type: MCQ
+            q_marks: "1"
+            from_bank: true        # use unused question-bank questions first
+
+Each paper is written to <output-dir>/<id>/, with any shuffled sets in
+<output-dir>/<id>/sets/. Finished papers are recorded
+in <output-dir>/batch_state.json, so rerunning after a crash only
+generates what is missing.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from paper_generator import generate_paper_sections
+from paper_variants import render_variants
+from rate_limiter import llm_rate_limiter
+from render_pipeline import render_paper
+
+OUTPUT_FILES = {
+    "question_paper": "question_paper.pdf",
+    "answer_sheet": "answer_sheet.pdf",
+    "docx": "question_paper.docx",
+}
+HEADER_FIELDS = ("exam_name", "school_name", "class_name", "subject", "time", "max_marks")
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults", {})
+    papers = []
+    for idx, entry in enumerate(manifest.get("papers", [])):
+        paper = dict(defaults, **entry)
+        paper["pdfs"] = [os.path.join(base_dir, pdf) for pdf in paper.get("pdfs", [])]
+        if not paper["pdfs"]:
+            raise ValueError(f"Paper {idx + 1} in {path} lists no source PDFs")
+        if not paper.get("sections"):
+            raise ValueError(f"Paper {idx + 1} in {path} has no sections")
+        paper["id"] = str(paper.get("id") or _paper_slug(paper, idx))
+        papers.append(paper)
+    ids = [paper["id"] for paper in papers]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Paper ids in the manifest must be unique")
+    return papers
+
+
+def _paper_slug(paper, idx):
+    name = "-".join(str(paper.get(field, "")) for field in ("class_name", "subject", "exam_name"))
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower()
+    return f"{idx + 1:03d}-{slug}" if slug else f"{idx + 1:03d}"
+
+
+def build_section_data(paper):
+    section_data = []
+    for i, section in enumerate(paper["sections"]):
+        section_data.append({
+            "section_name": section.get("section_name", f"Section {chr(65 + i)}"),
+            "section_marks": str(section.get("section_marks", "")),
+            "num_questions": int(section.get("num_questions", 2)),
+            "q_type": section.get("q_type", "MCQ"),
+            "q_marks": str(section.get("q_marks", "")),
+            "topic": section.get("topic", ""),
+            "from_bank": bool(section.get("from_bank", False)),
+            "questions": []
+        })
+    return section_data
+
+
+class BatchState:
+    """Records finished paper ids in a JSON file so a rerun can resume."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = set(json.load(f).get("done", []))
+        except (OSError, ValueError):
+            self.done = set()
+
+    def mark_done(self, paper_id):
+        with self._lock:
+            self.done.add(paper_id)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"done": sorted(self.done)}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def generate_paper(paper, output_dir, use_cache=True):
+    section_data = generate_paper_sections(
+        paper["pdfs"], build_section_data(paper), use_cache=use_cache,
+        avoid_repeats=bool(paper.get("avoid_repeats", False))
+    )
+    for section in section_data:
+        if section.get("shortfall"):
+            print(f"[short] {paper['id']}: {section['section_name']} has {len(section['questions'])} of "
+                  f"{section['num_questions']} questions", file=sys.stderr)
+    files = render_paper(
+        section_data,
+        notes=paper.get("notes") or [],
+        **{field: str(paper.get(field, "")) for field in HEADER_FIELDS}
+    )
+    paper_dir = os.path.join(output_dir, paper["id"])
+    os.makedirs(paper_dir, exist_ok=True)
+    for name, filename in OUTPUT_FILES.items():
+        _write_atomic(os.path.join(paper_dir, filename), files[name])
+    num_sets = int(paper.get("sets", 0) or 0)
+    if num_sets:
+        variants = render_variants(
+            section_data, num_sets, seed=paper.get("seed", 0),
+            notes=paper.get("notes") or [],
+            **{field: str(paper.get(field, "")) for field in HEADER_FIELDS}
+        )
+        sets_dir = os.path.join(paper_dir, "sets")
+        os.makedirs(sets_dir, exist_ok=True)
+        for label, set_files in variants:
+            _write_atomic(os.path.join(sets_dir, f"set_{label}_question_paper.pdf"), set_files["question_paper"])
+            _write_atomic(os.path.join(sets_dir, f"set_{label}_answer_sheet.pdf"), set_files["answer_sheet"])
+    return paper_dir
+
+
+def _is_complete(paper, output_dir):
+    paper_dir = os.path.join(output_dir, paper["id"])
+    return all(os.path.exists(os.path.join(paper_dir, filename)) for filename in OUTPUT_FILES.values())
+
+
+def run_batch(papers, output_dir, workers=4, use_cache=True):
+    """Generate every paper not already finished; returns the ids that failed."""
+    os.makedirs(output_dir, exist_ok=True)
+    state = BatchState(os.path.join(output_dir, "batch_state.json"))
+    pending = [p for p in papers if not (p["id"] in state.done and _is_complete(p, output_dir))]
+    skipped = len(papers) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} paper(s) finished in an earlier run")
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(generate_paper, paper, output_dir, use_cache): paper["id"] for paper in pending}
+        for future in as_completed(futures):
+            paper_id = futures[future]
+            try:
+                paper_dir = future.result()
+            except Exception:
+                failed.append(paper_id)
+                print(f"[failed] {paper_id}", file=sys.stderr)
+                traceback.print_exc()
+                continue
+            state.mark_done(paper_id)
+            print(f"[done] {paper_id} -> {paper_dir}")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate question papers in bulk from a YAML/JSON manifest.")
+    parser.add_argument("manifest", help="Path to the YAML or JSON manifest")
+    parser.add_argument("--output-dir", default="papers", help="Directory for generated papers (default: papers)")
+    parser.add_argument("--workers", type=int, default=4, help="Papers generated in parallel (default: 4)")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="Global limit on LLM calls per minute across all workers (default: PAPERMAKER_LLM_RPM or unlimited)")
+    parser.add_argument("--force-fresh", action="store_true", help="Bypass the LLM response cache")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.rpm is not None:
+        llm_rate_limiter.set_rate(args.rpm)
+    papers = load_manifest(args.manifest)
+    failed = run_batch(papers, args.output_dir, workers=args.workers, use_cache=not args.force_fresh)
+    if failed:
+        print(f"{len(failed)} paper(s) failed: {', '.join(sorted(failed))}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
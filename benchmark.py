@@ -0,0 +1,289 @@
+"""Offline performance benchmark for ingestion, generation and rendering.
+
+Usage:
+    python benchmark.py --pages 10,100 --sections 1,4 --repeats 3 --output bench.json
+    python benchmark.py --pages 10,100 --sections 1,4 --compare bench.json
+
+Synthetic PDFs are generated for each corpus size, and a fake chat model
+and fake embeddings stand in for Gemini, so no API key or network is
+needed. Every stage (extract, chunk, embed, bm25_index, retrieve,
+generate, render_pdf, render_docx) is timed for each combination of page
+count and section count. Each case runs in its own process, so the peak
+RSS reported for it is that case's alone. The JSON report has latency
+percentiles, throughput and peak RSS per run. --compare prints the p50 change against
+an earlier report.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fpdf import FPDF
+
+PERCENTILES = (50, 90, 99)
+QUERIES_PER_RUN = 20
+
+
+def make_synthetic_pdf(num_pages, seed=0):
+    """Return the bytes of a num_pages text PDF with reproducible pseudo-textbook prose."""
+    from fake_llm import WORDS
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=11)
+    for page in range(num_pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, f"Chapter {page // 10 + 1}, page {page + 1}")
+        for _ in range(8):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+                for _ in range(4)
+            ]
+            pdf.multi_cell(0, 5, " ".join(sentences))
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(durations, items=None, unit=None):
+    """Latency stats in seconds, plus items/second when a per-sample item count is given."""
+    stats = {"samples": len(durations), "mean": sum(durations) / len(durations)}
+    stats.update({f"p{pct}": percentile(durations, pct) for pct in PERCENTILES})
+    stats["max"] = max(durations)
+    if items is not None and sum(durations) > 0:
+        stats["throughput"] = items * len(durations) / sum(durations)
+        stats["unit"] = f"{unit}/s"
+    return stats
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class _Document:
+    def __init__(self, page_content):
+        self.page_content = page_content
+
+
+class _MemoryCollection:
+    def __init__(self):
+        self.vectors = {}
+
+    def get(self, ids, include=None):
+        return {"ids": [key for key in ids if key in self.vectors]}
+
+    def add(self, ids, embeddings, documents):
+        for key, vector, text in zip(ids, embeddings, documents):
+            self.vectors[key] = (vector, text)
+
+
+class MemoryVectorStore:
+    """In-process vector store with the parts of the Chroma API the app uses."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self._collection = _MemoryCollection()
+
+    def similarity_search(self, query, k=4):
+        query_vector = self.embeddings.embed_query(query)
+        scored = sorted(
+            self._collection.vectors.values(),
+            key=lambda entry: -sum(a * b for a, b in zip(query_vector, entry[0]))
+        )
+        return [_Document(text) for _, text in scored[:k]]
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run_case(num_pages, num_sections, args, work_dir):
+    from answer_sheet_template import create_answer_sheet_pdf
+    from corpus_store import corpus_id
+    from docx_template import create_question_paper_docx
+    from fake_llm import FakeChatModel, FakeEmbeddings, WORDS
+    from lexical_index import build_lexical_index, index_path
+    from paper_generator import generate_paper_sections, get_text_chunks
+    from paper_model import structure_sections
+    from pdf_ingest import extract_pages, hash_bytes
+    from question_paper_template import create_question_paper_pdf
+    from resources import drop_corpus_store, set_corpus_store
+    from retrieval import hybrid_search
+    from vector_index import EmbeddingCache, index_chunks
+
+    data = make_synthetic_pdf(num_pages, seed=num_pages)
+    pdf_path = os.path.join(work_dir, f"synthetic_{num_pages}.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(data)
+    corpus = corpus_id([hash_bytes(data)])
+    queries = [" ".join(random.Random(i).sample(WORDS, 3)) for i in range(QUERIES_PER_RUN)]
+    timings = {name: [] for name in ("extract", "chunk", "embed", "bm25_index", "generate", "render_pdf", "render_docx")}
+    retrieve_latencies = []
+    counts = {}
+
+    for repeat in range(args.repeats):
+        elapsed, pages = _timed(extract_pages, data)
+        timings["extract"].append(elapsed)
+        elapsed, chunks = _timed(get_text_chunks, "".join(pages))
+        timings["chunk"].append(elapsed)
+
+        embeddings = FakeEmbeddings(latency=args.embed_latency)
+        store = MemoryVectorStore(embeddings)
+        # A fresh embedding cache per repeat, so every repeat embeds everything
+        cache = EmbeddingCache(os.path.join(work_dir, f"embeddings_{num_pages}_{num_sections}_{repeat}.sqlite"))
+        elapsed, _ = _timed(index_chunks, store, chunks, embeddings, cache=cache)
+        timings["embed"].append(elapsed)
+
+        if os.path.exists(index_path(corpus)):
+            os.remove(index_path(corpus))
+        drop_corpus_store(corpus)
+        elapsed, _ = _timed(build_lexical_index, corpus, chunks)
+        timings["bm25_index"].append(elapsed)
+        set_corpus_store(corpus, store)
+        for query in queries:
+            elapsed, _ = _timed(hybrid_search, query, corpus, timeout=None)
+            retrieve_latencies.append(elapsed)
+
+        section_data = [
+            {
+                "section_name": f"Section {chr(65 + i)}",
+                "topic": random.Random(i).choice(WORDS),
+                "num_questions": args.questions,
+                "q_type": ("MCQ", "Short", "Long")[i % 3],
+                "q_marks": str(i + 1),
+                "questions": [],
+            }
+            for i in range(num_sections)
+        ]
+        model = FakeChatModel(latency=args.llm_latency)
+        elapsed, _ = _timed(generate_paper_sections, [pdf_path], section_data, use_cache=False, model=model)
+        timings["generate"].append(elapsed)
+        counts["questions"] = sum(len(section["questions"]) for section in section_data)
+        counts["llm_calls"] = model.calls
+
+        structure_sections(section_data)
+        header = dict(school_name="Benchmark School", exam_name="Benchmark", class_name="10",
+                      subject="Science", time="3 Hours", max_marks="80")
+        elapsed, _ = _timed(lambda: (
+            create_question_paper_pdf(paper_name="Benchmark", questions_by_section=section_data,
+                                      total_marks="80", notes=["All questions are compulsory"], **header),
+            create_answer_sheet_pdf(paper_name="Benchmark", questions_by_section=section_data, **header),
+        ))
+        timings["render_pdf"].append(elapsed)
+        elapsed, _ = _timed(create_question_paper_docx, paper_name="Benchmark", questions_by_section=section_data,
+                            total_marks="80", notes=["All questions are compulsory"], **header)
+        timings["render_docx"].append(elapsed)
+    drop_corpus_store(corpus)
+
+    stages = {
+        "extract": summarize(timings["extract"], num_pages, "pages"),
+        "chunk": summarize(timings["chunk"], len(chunks), "chunks"),
+        "embed": summarize(timings["embed"], len(chunks), "chunks"),
+        "bm25_index": summarize(timings["bm25_index"], len(chunks), "chunks"),
+        "retrieve": summarize(retrieve_latencies, 1, "queries"),
+        "generate": summarize(timings["generate"], counts["questions"], "questions"),
+        "render_pdf": summarize(timings["render_pdf"], 1, "papers"),
+        "render_docx": summarize(timings["render_docx"], 1, "papers"),
+    }
+    return {
+        "name": f"pages={num_pages},sections={num_sections}",
+        "pages": num_pages,
+        "sections": num_sections,
+        "chunks": len(chunks),
+        "questions": counts["questions"],
+        "llm_calls_per_paper": counts["llm_calls"],
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(report, baseline):
+    """Print the p50 change of every stage against a baseline report."""
+    previous = {run["name"]: run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        old_run = previous.get(run["name"])
+        if old_run is None:
+            print(f"{run['name']}: not in baseline")
+            continue
+        for stage, stats in run["stages"].items():
+            old = old_run["stages"].get(stage, {}).get("p50")
+            if not old:
+                continue
+            change = (stats["p50"] - old) / old * 100
+            print(f"{run['name']:<28} {stage:<12} p50 {old * 1000:9.2f} ms -> {stats['p50'] * 1000:9.2f} ms ({change:+.1f}%)")
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PaperMaker stages offline with synthetic PDFs and fake models.")
+    parser.add_argument("--pages", type=_int_list, default=[10, 100], help="Comma-separated corpus sizes in pages (default: 10,100)")
+    parser.add_argument("--sections", type=_int_list, default=[1, 4], help="Comma-separated section counts (default: 1,4)")
+    parser.add_argument("--questions", type=int, default=5, help="Questions per section (default: 5)")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeats per case (default: 3)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake chat model latency per call in seconds")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Fake embedding latency per call in seconds")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON report to compare p50 latencies against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="papermaker-bench-") as work_dir:
+        # Fresh caches, so no stage is served from a real run's cache
+        os.environ["PAPERMAKER_CACHE_DIR"] = os.path.join(work_dir, "cache")
+        os.environ["PAPERMAKER_CHROMA_DIR"] = os.path.join(work_dir, "chroma")
+        os.environ["PAPERMAKER_QUESTION_BANK"] = os.path.join(work_dir, "questions.sqlite")
+        runs = []
+        for num_pages in args.pages:
+            for num_sections in args.sections:
+                print(f"Running pages={num_pages} sections={num_sections}", file=sys.stderr)
+                # A fresh interpreter per case, so ru_maxrss is not carried over from earlier cases
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    runs.append(pool.submit(run_case, num_pages, num_sections, args, work_dir).result())
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Root directory for all on-disk caches; override with PAPERMAKER_CACHE_DIR
+CACHE_ROOT = os.getenv("PAPERMAKER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "papermaker", "cache"))
+
+
+def cache_dir(name):
+    path = os.path.join(CACHE_ROOT, name)
+    os.makedirs(path, exist_ok=True)
+    return path
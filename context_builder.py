@@ -0,0 +1,78 @@
+import os
+import re
+
+# Approximate token budget for the document context of one generation prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PAPERMAKER_CONTEXT_TOKENS", "12000"))
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def section_query(section):
+    # An explicit topic wins; otherwise use a custom section name, but not the default "Section A"
+    topic = (section.get("topic") or "").strip()
+    if topic:
+        return topic
+    name = (section.get("section_name") or "").strip()
+    if name and not re.fullmatch(r"Section [A-Z]", name):
+        return name
+    return None
+
+
+def coverage_order(num_chunks, picks, section_index=0, num_sections=1):
+    # Evenly spaced chunk indices across the document, shifted per section so
+    # sections sample different parts, followed by the remaining chunks
+    if num_chunks == 0:
+        return []
+    picks = max(1, min(picks, num_chunks))
+    stride = num_chunks / picks
+    offset = stride * section_index / max(num_sections, 1)
+    order = []
+    for j in range(picks):
+        idx = int(offset + j * stride) % num_chunks
+        if idx not in order:
+            order.append(idx)
+    order.extend(i for i in range(num_chunks) if i not in order)
+    return order
+
+
+def build_section_context(chunks, section_index=0, num_sections=1, query=None, retriever=None,
+                          token_budget=CONTEXT_TOKEN_BUDGET):
+    """Select and pack document chunks for one section's prompt.
+
+    Chunks similar to query (via retriever, which returns chunk texts) come
+    first, then chunks sampled for coverage. Returns (context, chunk_ids)
+    with chunk_ids in document order.
+    """
+    order = []
+    if query and retriever is not None:
+        index_of = {text: i for i, text in enumerate(chunks)}
+        try:
+            retrieved = retriever(query)
+        except Exception:
+            # Retrieval is an optimisation; fall back to coverage sampling
+            retrieved = []
+        for text in retrieved:
+            idx = index_of.get(text)
+            if idx is not None and idx not in order:
+                order.append(idx)
+    avg_tokens = max(1, sum(estimate_tokens(c) for c in chunks) // max(len(chunks), 1))
+    picks = max(1, token_budget // avg_tokens)
+    order.extend(i for i in coverage_order(len(chunks), picks, section_index, num_sections) if i not in order)
+
+    selected = []
+    remaining = token_budget
+    for idx in order:
+        cost = estimate_tokens(chunks[idx])
+        if cost <= remaining:
+            selected.append(idx)
+            remaining -= cost
+    if not selected and order:
+        # A single chunk larger than the budget is truncated rather than dropped
+        selected = [order[0]]
+        context = chunks[order[0]][:token_budget * CHARS_PER_TOKEN]
+        return context, selected
+    selected.sort()
+    return "\n\n".join(chunks[i] for i in selected), selected
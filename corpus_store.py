@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Each corpus (set of uploaded files) gets its own Chroma directory under this root
+CHROMA_ROOT = os.getenv("PAPERMAKER_CHROMA_DIR", "chroma_db")
+DISK_BUDGET_BYTES = int(float(os.getenv("PAPERMAKER_CHROMA_BUDGET_MB", "2048")) * 1024 * 1024)
+# Unreferenced corpora older than this are removed even under budget
+CORPUS_TTL_SECONDS = float(os.getenv("PAPERMAKER_CORPUS_TTL_HOURS", "168")) * 3600
+# Sessions that stop refreshing their reference are treated as gone
+SESSION_TTL_SECONDS = float(os.getenv("PAPERMAKER_SESSION_TTL_HOURS", "6")) * 3600
+
+
+def corpus_id(file_digests):
+    # Order-independent, so the same upload set always maps to the same collection
+    return hashlib.sha256("\n".join(sorted(file_digests)).encode("utf-8")).hexdigest()[:32]
+
+
+def corpus_path(corpus):
+    return os.path.join(CHROMA_ROOT, corpus)
+
+
+def collection_name(corpus):
+    return f"corpus_{corpus}"
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class CorpusRegistry:
+    """Tracks which sessions use which corpus and evicts unused collections.
+
+    State lives in registry.json under CHROMA_ROOT so it survives restarts.
+    """
+
+    def __init__(self, root=CHROMA_ROOT, disk_budget=DISK_BUDGET_BYTES,
+                 corpus_ttl=CORPUS_TTL_SECONDS, session_ttl=SESSION_TTL_SECONDS):
+        self.root = root
+        self.disk_budget = disk_budget
+        self.corpus_ttl = corpus_ttl
+        self.session_ttl = session_ttl
+        self.path = os.path.join(root, "registry.json")
+        self._lock = threading.Lock()
+        self._evict_callbacks = []
+
+    def on_evict(self, callback):
+        self._evict_callbacks.append(callback)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def acquire(self, corpus, session_id):
+        """Mark corpus as the active corpus of session_id."""
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            for other, entry in entries.items():
+                if other != corpus:
+                    entry["sessions"].pop(session_id, None)
+            entry = entries.setdefault(corpus, {"sessions": {}})
+            entry["sessions"][session_id] = now
+            entry["last_used"] = now
+            self._save(entries)
+
+    def evict(self):
+        """Remove unreferenced corpora past their TTL, then LRU until under budget."""
+        now = time.time()
+        removed = []
+        with self._lock:
+            entries = self._load()
+            # Directories without a registry entry (e.g. after a crash) are eligible too,
+            # aged by their mtime so one that is still being written is not taken as expired
+            if os.path.isdir(self.root):
+                for name in os.listdir(self.root):
+                    path = os.path.join(self.root, name)
+                    if os.path.isdir(path) and name not in entries:
+                        try:
+                            last_used = os.path.getmtime(path)
+                        except OSError:
+                            continue
+                        entries[name] = {"sessions": {}, "last_used": last_used}
+            for entry in entries.values():
+                entry["sessions"] = {
+                    sid: ts for sid, ts in entry["sessions"].items() if now - ts < self.session_ttl
+                }
+            sizes = {corpus: _dir_size(os.path.join(self.root, corpus)) for corpus in entries}
+            total = sum(sizes.values())
+            for corpus in sorted(entries, key=lambda c: entries[c].get("last_used", 0)):
+                entry = entries[corpus]
+                if entry["sessions"]:
+                    continue
+                expired = now - entry.get("last_used", 0) > self.corpus_ttl
+                if expired or total > self.disk_budget:
+                    shutil.rmtree(os.path.join(self.root, corpus), ignore_errors=True)
+                    total -= sizes[corpus]
+                    removed.append(corpus)
+            for corpus in removed:
+                del entries[corpus]
+            self._save(entries)
+        for corpus in removed:
+            for callback in self._evict_callbacks:
+                callback(corpus)
+        return removed
+
+
+registry = CorpusRegistry()
@@ -0,0 +1,39 @@
+import io
+
+import docx
+
+from paper_model import question_lines
+from question_parser import clean_stem
+
+
+def create_question_paper_docx(
+    paper_name, questions_by_section, total_marks, output_path=None,
+    school_name=None, exam_name=None, class_name=None, subject=None, time=None, notes=None, max_marks=None
+):
+    doc = docx.Document()
+    doc.add_heading(school_name, 0)
+    doc.add_paragraph(f"Exam: {exam_name}")
+    doc.add_paragraph(f"Class: {class_name}")
+    doc.add_paragraph(f"Subject: {subject}")
+    doc.add_paragraph(f"Time: {time}")
+    doc.add_paragraph(f"Maximum Marks: {max_marks}")
+    if notes:
+        doc.add_paragraph("Notes:")
+        for note in notes:
+            doc.add_paragraph(note, style='List Bullet')
+    for section in questions_by_section:
+        doc.add_heading(section['section_name'], level=1)
+        for idx, q in enumerate(section['questions']):
+            lines = question_lines(q)
+            if lines:
+                # The Q-number replaces the stem's own numbering
+                lines[0] = clean_stem(lines[0])
+            para = doc.add_paragraph()
+            para.add_run(f"Q{idx+1}. " + '\n'.join(lines)).bold = False
+            para.add_run(f"   [{q['marks']} marks]").italic = True
+    if output_path:
+        doc.save(output_path)
+        return output_path
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
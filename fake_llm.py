@@ -0,0 +1,111 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChatModel:
+    """Offline stand-in for ChatGoogleGenerativeAI.
+
+    Answers question-generation prompts with numbered placeholder questions
+    after an optional delay, and can fail its first calls to exercise retries.
+    """
+
+    def __init__(self, latency=0.0, fail_times=0):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        self._start_call()
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(self._answer(str(prompt)))
+
+    def stream(self, prompt):
+        # Same answer as invoke, delivered in small chunks with the latency spread across them
+        self._start_call()
+        text = self._answer(str(prompt))
+        chunks = [text[i:i + 20] for i in range(0, len(text), 20)] or [""]
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            yield FakeResponse(chunk)
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+        if call_number <= self.fail_times:
+            raise RuntimeError("Fake transient LLM failure")
+
+    def _answer(self, prompt):
+        match = re.search(r"Generate (\d+) ", prompt)
+        num_questions = int(match.group(1)) if match else 5
+        if "JSON array" in prompt:
+            items = []
+            for i in range(1, num_questions + 1):
+                item = {"stem": self._stem(prompt, i), "answer": f"Model answer {i}", "difficulty": "medium"}
+                if "multiple choice" in prompt:
+                    item["options"] = {letter: f"Option {letter}" for letter in "ABCD"}
+                    item["answer"] = "ABCD"[i % 4]
+                items.append(item)
+            return json.dumps(items, indent=2)
+        lines = []
+        for i in range(1, num_questions + 1):
+            if "multiple choice" in prompt:
+                lines.append(f"{i}. Placeholder multiple choice question {i}?")
+                lines.extend(f"{letter}) Option {letter}" for letter in "ABCD")
+                lines.append(f"Answer: {'ABCD'[i % 4]}")
+            else:
+                lines.append(f"{i}. Placeholder question {i}?")
+        return "\n".join(lines)
+
+    def _stem(self, prompt, i):
+        # Deterministic per prompt, but different questions don't look like near-duplicates
+        rng = random.Random(hashlib.sha256(f"{prompt}\0{i}".encode("utf-8")).digest())
+        return f"Explain how {' '.join(rng.sample(WORDS, 5))} relate?"
+
+
+class FakeEmbeddings:
+    """Offline stand-in for GoogleGenerativeAIEmbeddings.
+
+    Vectors are derived from a hash of the text, so equal texts always get
+    equal vectors; each call sleeps for latency seconds.
+    """
+
+    def __init__(self, latency=0.0, dimensions=64):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def _vector(self, text):
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+
+
+WORDS = (
+    "acid base cell energy force motion light sound heat atom molecule electron current voltage "
+    "magnet gravity orbit planet climate river soil plant root leaf enzyme protein tissue organ "
+    "blood nerve gene fossil rock mineral metal salt water carbon oxygen nitrogen pressure density "
+    "friction lens mirror wave circuit fuel habitat species"
+).split()
@@ -0,0 +1,52 @@
+import os
+import threading
+
+FONT_FAMILY = 'NotoSansMath'
+FONT_PATH = os.path.join(os.path.dirname(__file__), "NotoSansMath-Regular.ttf")
+
+# Parsed TTF metrics per font file, shared by every FPDF document in the process
+_font_registry = {}
+_font_lock = threading.Lock()
+
+
+def add_unicode_font(pdf, family=FONT_FAMILY, font_path=FONT_PATH):
+    """Register a Unicode TTF font on pdf, parsing the file at most once per process.
+
+    PyFPDF already embeds only the glyphs a document uses, so cached
+    metrics are all that is needed to keep both render time and output
+    size down. Other FPDF variants fall back to a plain add_font call.
+    """
+    fontkey = family.lower()
+    with _font_lock:
+        cached = _font_registry.get(font_path)
+        if cached is None or not isinstance(getattr(pdf, 'fonts', None), dict):
+            # Parsed under the lock: on a cold start PyFPDF writes a metrics
+            # pickle next to the font, and a parallel renderer would read it half written
+            pdf.add_font(family, '', font_path, uni=True)
+            font = pdf.fonts.get(fontkey)
+            if isinstance(font, dict) and fontkey in pdf.font_files:
+                _font_registry[font_path] = (
+                    {k: v for k, v in font.items() if k not in ('i', 'subset', 'n')},
+                    dict(pdf.font_files[fontkey])
+                )
+            return
+    if fontkey in pdf.fonts:
+        return
+    font, font_file = cached
+    # Mirror PyFPDF's add_font: the glyph subset and object ids are per document
+    subset = list(range(0, 57)) if hasattr(pdf, 'str_alias_nb_pages') else list(range(0, 32))
+    pdf.fonts[fontkey] = dict(font, i=len(pdf.fonts) + 1, subset=subset)
+    pdf.font_files[fontkey] = dict(font_file)
+    pdf.font_files[font_path] = {'type': "TTF"}
+
+
+def finish_pdf(pdf, output_path=None):
+    # Write to output_path when given, otherwise return the document as bytes
+    if output_path:
+        pdf.output(output_path)
+        return output_path
+    data = pdf.output(dest='S')
+    if isinstance(data, str):
+        # PyFPDF returns the buffer as a latin-1 string
+        data = data.encode('latin-1')
+    return bytes(data)
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from tracing import bind
+
+# Papers generated at once across all sessions
+JOB_WORKERS = int(os.getenv("PAPERMAKER_JOB_WORKERS", "4"))
+# Finished jobs are forgotten after this long
+JOB_TTL_SECONDS = float(os.getenv("PAPERMAKER_JOB_TTL_MINUTES", "60")) * 60
+
+
+class Job:
+    """A unit of background work with progress reporting and cooperative cancellation."""
+
+    def __init__(self, key=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.message = "Waiting for a free worker"
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        # Results published while the job runs, e.g. questions as they are parsed
+        self.partial = {}
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_progress(self, done=None, total=None, message=None):
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+
+    def advance(self, message=None):
+        with self._lock:
+            self.done += 1
+            if message is not None:
+                self.message = message
+
+    def set_partial(self, key, value):
+        with self._lock:
+            self.partial[key] = value
+
+    def partial_items(self):
+        with self._lock:
+            return sorted(self.partial.items())
+
+    @property
+    def fraction(self):
+        with self._lock:
+            return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise CancelledError("Job was cancelled")
+
+
+class JobManager:
+    def __init__(self, max_workers=JOB_WORKERS, ttl=JOB_TTL_SECONDS):
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="papermaker-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, **kwargs):
+        """Run fn(job, *args, **kwargs) in the background and return the Job.
+
+        If an unfinished job with the same key exists it is returned instead,
+        so a rerun of the script does not start the same work twice.
+        """
+        with self._lock:
+            self._forget_expired()
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and not job.finished:
+                        return job
+            job = Job(key)
+            self._jobs[job.id] = job
+        self._pool.submit(bind(self._run), job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+        except CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _forget_expired(self):
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished_at > self.ttl]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
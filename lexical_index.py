@@ -0,0 +1,104 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from corpus_store import corpus_path
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOKEN_RE = re.compile(r"\w+")
+INDEX_FILENAME = "lexical_index.json"
+
+_build_locks = {}
+_build_locks_lock = threading.Lock()
+
+
+def tokenize(text):
+    # Keeps formula-like tokens such as "h2o" or "f_net" whole
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory inverted index over a corpus's text chunks, scored with BM25."""
+
+    def __init__(self, chunks, postings=None, lengths=None):
+        self.chunks = chunks
+        if postings is None:
+            postings, lengths = {}, []
+            for idx, chunk in enumerate(chunks):
+                counts = Counter(tokenize(chunk))
+                lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    postings.setdefault(term, []).append((idx, tf))
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def search(self, query, k=4):
+        """Return up to k (chunk index, score) pairs, best first."""
+        if not self.chunks:
+            return []
+        num_docs = len(self.chunks)
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[idx] / self.avg_length)
+                scores[idx] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores.most_common(k)
+
+    def search_texts(self, query, k=4):
+        return [self.chunks[idx] for idx, _ in self.search(query, k)]
+
+    def save(self, path):
+        # Unique per writer, so concurrent builds of the same corpus never share a temp file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"chunks": self.chunks, "postings": self.postings, "lengths": self.lengths}, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: [tuple(p) for p in entries] for term, entries in data["postings"].items()}
+        return cls(data["chunks"], postings, data["lengths"])
+
+
+def index_path(corpus):
+    # Lives inside the corpus directory so it is evicted together with the Chroma store
+    return os.path.join(corpus_path(corpus), INDEX_FILENAME)
+
+
+def build_lexical_index(corpus, text_chunks):
+    """Build and save the corpus's BM25 index unless it already exists."""
+    path = index_path(corpus)
+    with _build_locks_lock:
+        lock = _build_locks.setdefault(corpus, threading.Lock())
+    # Sessions processing the same book in this process build it once
+    with lock:
+        # Corpus ids are content hashes, so an existing index is always current
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        BM25Index(list(text_chunks)).save(path)
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merge ranked lists of keys; each key scores sum(1 / (k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
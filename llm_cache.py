@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cache_config import cache_dir
+from rate_limiter import llm_rate_limiter
+from tracing import record_span, span, start_span, token_counts
+
+MAX_ENTRIES = int(os.getenv("PAPERMAKER_LLM_CACHE_ENTRIES", "5000"))
+MAX_BYTES = int(float(os.getenv("PAPERMAKER_LLM_CACHE_MB", "256")) * 1024 * 1024)
+TTL_SECONDS = float(os.getenv("PAPERMAKER_LLM_CACHE_TTL_HOURS", "720")) * 3600
+
+
+def normalize_prompt(prompt):
+    # Indentation and blank-line differences in the f-string templates must not change the key
+    return " ".join(str(prompt).split())
+
+
+def response_key(corpus, prompt, model_name, temperature):
+    payload = json.dumps([corpus or "", normalize_prompt(prompt), model_name, temperature])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite cache of LLM responses with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.path = path or os.path.join(cache_dir("llm"), "responses.sqlite")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def model_signature(model):
+    return getattr(model, "model", type(model).__name__), getattr(model, "temperature", None)
+
+
+def response_text(response):
+    if hasattr(response, 'content'):
+        return response.content
+    return str(response)
+
+
+def cached_invoke(model, prompt, corpus=None, use_cache=True, keep=None):
+    """Return model.invoke(prompt) as text, served from the cache when possible.
+
+    With use_cache=False the model is always called and the fresh
+    response replaces any cached one. keep(text), when given, decides
+    whether a fresh response is worth caching.
+    """
+    cache = get_response_cache()
+    model_name, temperature = model_signature(model)
+    key = response_key(corpus, prompt, model_name, temperature)
+    with span("llm.invoke", model=model_name) as call:
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                call.set(cache_hit=True, **token_counts(prompt, cached))
+                return cached
+        call.set(cache_hit=False)
+        # Only calls that reach the API count against the rate limit
+        waited = time.perf_counter()
+        llm_rate_limiter.acquire()
+        call.set(rate_limit_wait=time.perf_counter() - waited)
+        response = model.invoke(prompt)
+        text = response_text(response)
+        call.set(**token_counts(prompt, text, response))
+        if keep is None or keep(text):
+            cache.put(key, text)
+        return text
+
+
+def stream_text(model, prompt):
+    """Yield the model's response text chunk by chunk, without caching."""
+    # The generator may be resumed from another context, so its span is never made current
+    call = start_span("llm.stream", model=model_signature(model)[0], cache_hit=False)
+    parts = []
+    error = None
+    try:
+        waited = time.perf_counter()
+        llm_rate_limiter.acquire()
+        call.set(rate_limit_wait=time.perf_counter() - waited)
+        if not hasattr(model, "stream"):
+            parts.append(response_text(model.invoke(prompt)))
+            yield parts[-1]
+            return
+        for chunk in model.stream(prompt):
+            text = response_text(chunk)
+            if text:
+                if not parts:
+                    call.set(first_token=time.time() - call.start)
+                parts.append(text)
+                yield text
+    except GeneratorExit:
+        # The consumer stopped reading early; that is not an error
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        # Streamed chunks carry no reliable usage totals, so tokens are estimated
+        call.set(**token_counts(prompt, "".join(parts)))
+        call.finish(error)
+
+
+def cached_stream(model, prompt, corpus=None, use_cache=True, keep=None):
+    """Streaming counterpart of cached_invoke.
+
+    A cache hit is yielded as a single chunk; a fresh response is stored
+    once the stream has been consumed completely.
+    """
+    cache = get_response_cache()
+    key = response_key(corpus, prompt, *model_signature(model))
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            record_span("llm.stream", 0.0, model=model_signature(model)[0], cache_hit=True,
+                        **token_counts(prompt, cached))
+            yield cached
+            return
+    parts = []
+    for text in stream_text(model, prompt):
+        parts.append(text)
+        yield text
+    text = "".join(parts)
+    if keep is None or keep(text):
+        cache.put(key, text)
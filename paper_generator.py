@@ -0,0 +1,295 @@
+import itertools
+import os
+import threading
+
+from context_builder import build_section_context, section_query
+from corpus_store import corpus_id, corpus_path
+from llm_cache import cached_invoke, cached_stream
+from pdf_ingest import get_document_pages
+from question_bank import MinHashIndex, get_question_bank, minhash_signature
+from question_parser import StructuredQuestionParser, clean_stem, format_question
+from resources import get_chat_model
+from retrieval import hybrid_search
+from section_scheduler import (CALL_TIMEOUT, call_with_retries, call_with_timeout, check_cancelled, iter_with_timeout,
+                               run_sections)
+from tracing import annotate, count, span
+
+# Question generation shared by the Streamlit app and the batch CLI; must not import Streamlit
+
+# Extra requests for questions that were missing or failed validation
+MAX_REASKS = int(os.getenv("PAPERMAKER_MAX_REASKS", "2"))
+
+
+def get_pdf_text(pdf_docs):
+    return get_corpus(pdf_docs)[1]
+
+
+def get_corpus(pdf_docs):
+    # Pages are parsed once per file content and cached by SHA-256;
+    # the set of file hashes names the corpus
+    with span("extract", files=len(pdf_docs)) as stage:
+        documents = get_document_pages(pdf_docs)
+        raw_text = "".join(page for _, pages in documents for page in pages)
+        stage.set(pages=sum(len(pages) for _, pages in documents), chars=len(raw_text))
+    return corpus_id([digest for digest, _ in documents]), raw_text
+
+
+def get_text_chunks(text):
+    # langchain is slow to import, so it is loaded on first use
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    with span("chunk", chars=len(text)) as stage:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
+        chunks = text_splitter.split_text(text)
+        stage.set(chunks=len(chunks))
+    return chunks
+
+
+def get_similar_chunks(query, corpus, k=8):
+    # Retrieval only works once the corpus has been processed
+    if not os.path.isdir(corpus_path(corpus)):
+        return []
+    return hybrid_search(query, corpus, k=k)
+
+
+def _question_prompt(num_questions, output_format, difficulty, total_marks, paper_name, raw_text, existing=()):
+    if output_format == "MCQ":
+        format_instruction = f"Generate {num_questions} multiple choice questions (MCQ) with 4 options each (A, B, C, D)."
+        fields = """"stem": the question text,
+      "options": {"A": "...", "B": "...", "C": "...", "D": "..."},
+      "answer": the letter of the correct option,"""
+    else:
+        kind = {"Short": "short answer ", "Long": "long answer "}.get(output_format, "")
+        format_instruction = f"Generate {num_questions} {kind}questions."
+        fields = """"stem": the question text,
+      "answer": a brief model answer,"""
+    if existing:
+        avoid = "\n".join(f"    - {stem}" for stem in existing)
+        format_instruction += f" They must be different from these existing questions:\n{avoid}\n"
+    return f"""
+    You are an expert exam paper generator. {format_instruction}
+    Difficulty: {difficulty if difficulty and difficulty != 'Any' else 'Mixed'}
+    Total Marks/Duration: {total_marks if total_marks else 'Not specified'}
+    Paper Name: {paper_name}
+    
+    Document Content:
+    {raw_text}
+    
+    Output only a JSON array of exactly {num_questions} objects and no other text. Each object has:
+      {fields}
+      "difficulty": "easy", "medium" or "hard"
+    Do not number the questions.
+    """
+
+
+def _has_questions(text, output_format):
+    parser = StructuredQuestionParser(output_format)
+    return bool(parser.feed(text) or parser.close())
+
+
+def generate_questions_from_pdf(pdf_docs, num_questions, output_format, difficulty, total_marks, paper_name, raw_text=None, model=None, corpus=None, use_cache=True, on_question=None,
+                               existing=(), accept=None, on_surplus=None, cancel_event=None):
+    """Generate num_questions structured questions for one section.
+
+    Each question is a dict with 'text', 'stem', 'options', 'answer' and
+    'difficulty'. Missing or invalid items are re-requested on their own,
+    up to MAX_REASKS times, instead of regenerating the whole section.
+    Every model call has its own timeout and retries. Fewer than
+    num_questions are returned if the re-asks run out.
+    Questions in existing (e.g. from the question bank) are placed first;
+    accept(question) may reject near-duplicates, and valid questions beyond
+    num_questions are passed to on_surplus. Setting cancel_event stops
+    before the next model call, retry or streamed chunk with CancelledError.
+    """
+    questions = []
+    rejected = []
+    seen = set()
+
+    def add_question(question, check=True):
+        key = " ".join(question["stem"].lower().split())
+        if key in seen:
+            return
+        seen.add(key)
+        if len(questions) >= num_questions:
+            if on_surplus is not None:
+                on_surplus(question)
+            return
+        if check and accept is not None and not accept(question):
+            rejected.append(question["stem"])
+            return
+        question = format_question(question, len(questions) + 1)
+        if on_question is not None:
+            on_question(len(questions), question["text"])
+        questions.append(question)
+
+    for question in existing:
+        add_question(question, check=False)
+    if len(questions) >= num_questions:
+        return questions
+    if raw_text is None:
+        raw_text = get_pdf_text(pdf_docs)
+    if model is None:
+        model = get_chat_model()
+
+    # Responses without a single valid question are not cached, so a retry asks the model again
+    keep = lambda text: _has_questions(text, output_format)
+    asked = set()
+
+    def request(prompt):
+        parser = StructuredQuestionParser(output_format)
+        # A re-ask identical to an earlier prompt would only get the same cached answer back
+        cached = use_cache and prompt not in asked
+        asked.add(prompt)
+        if on_question is None:
+            chunks = [call_with_timeout(lambda: cached_invoke(model, prompt, corpus=corpus, use_cache=cached, keep=keep), CALL_TIMEOUT)]
+        else:
+            # Streaming: report each question as soon as its object is complete
+            chunks = iter_with_timeout(cached_stream(model, prompt, corpus=corpus, use_cache=cached, keep=keep), CALL_TIMEOUT)
+        for chunk in chunks:
+            check_cancelled(cancel_event)
+            for question in parser.feed(chunk):
+                add_question(question)
+        for question in parser.close():
+            add_question(question)
+
+    for attempt in range(MAX_REASKS + 1):
+        if attempt:
+            count("reasks")
+        missing = num_questions - len(questions)
+        prompt = _question_prompt(
+            missing, output_format, difficulty, total_marks, paper_name, raw_text,
+            existing=[q["stem"] for q in questions] + rejected
+        )
+        # The timeout is applied inside request(), so questions are only ever added on this thread
+        call_with_retries(lambda: request(prompt), timeout=None, cancel_event=cancel_event)
+        if len(questions) >= num_questions:
+            break
+    return questions
+
+
+def generate_paper_sections(pdf_docs, section_data, use_cache=True, model=None,
+                            on_section_done=None, cancel_event=None, on_question=None,
+                            avoid_repeats=False):
+    """Fill section["questions"] for every section and return section_data.
+
+    on_section_done(index, section) is called as soon as each section's
+    questions are in place. Passing on_question(section_index,
+    question_index, text) streams the responses and reports questions as
+    they are parsed.
+
+    Near-duplicates across sections are rejected, and with avoid_repeats
+    so are questions already used in an earlier paper. Sections with
+    "from_bank" set are filled from unused banked questions first.
+    Every question used, and any surplus, is added to the bank. A section
+    that could not be filled gets section["shortfall"], the number of
+    questions missing.
+    """
+    with span("generate_paper", sections=len(section_data)):
+        return _generate_paper_sections(pdf_docs, section_data, use_cache, model, on_section_done,
+                                        cancel_event, on_question, avoid_repeats)
+
+
+def _generate_paper_sections(pdf_docs, section_data, use_cache, model, on_section_done,
+                             cancel_event, on_question, avoid_repeats):
+    # Extract the uploads once and share the chunks across sections
+    corpus, raw_text = get_corpus(pdf_docs)
+    text_chunks = get_text_chunks(raw_text)
+    # Pack only the relevant chunks for each section into its prompt
+    section_contexts = []
+    with span("build_context", sections=len(section_data)):
+        for idx, section in enumerate(section_data):
+            context, section["context_chunks"] = build_section_context(
+                text_chunks,
+                section_index=idx,
+                num_sections=len(section_data),
+                query=section_query(section),
+                retriever=lambda query: get_similar_chunks(query, corpus)
+            )
+            section_contexts.append(context)
+
+    bank = get_question_bank()
+    paper_index = MinHashIndex()
+    paper_lock = threading.Lock()
+    paper_keys = itertools.count()
+    # Signatures each section has claimed in paper_index, released if the section fails
+    claimed = {}
+
+    def claim(idx, signature):
+        key = next(paper_keys)
+        paper_index.add(key, signature)
+        claimed.setdefault(idx, []).append(key)
+
+    def release(idx):
+        with paper_lock:
+            for key in claimed.pop(idx, []):
+                paper_index.remove(key)
+
+    def accept(idx, question):
+        signature = minhash_signature(clean_stem(question["stem"]))
+        with paper_lock:
+            if paper_index.find(signature) is not None:
+                return False
+            if avoid_repeats and bank.find_used(signature) is not None:
+                return False
+            claim(idx, signature)
+            return True
+
+    def generate_section(item):
+        idx, section, context = item
+        banked = []
+        if section.get("from_bank"):
+            # Stored questions need no LLM call; only the shortfall is generated
+            banked = bank.take_unused(corpus, section["q_type"], section["num_questions"])
+        try:
+            return _generate_section(idx, section, context, banked)
+        except BaseException:
+            # A failed section must not use up its banked questions or block later ones
+            release(idx)
+            bank.give_back(banked)
+            raise
+
+    def _generate_section(idx, section, context, banked):
+        annotate(section=section["section_name"], q_type=section["q_type"], questions=section["num_questions"])
+        report = None
+        if on_question is not None:
+            report = lambda q_idx, text: on_question(idx, q_idx, text)
+        for question in banked:
+            with paper_lock:
+                claim(idx, minhash_signature(clean_stem(question["stem"])))
+        return generate_questions_from_pdf(
+            pdf_docs,
+            section["num_questions"],
+            section["q_type"],
+            '', '', '',
+            raw_text=context,
+            model=model,
+            corpus=corpus,
+            # A cached response could only repeat questions already banked
+            use_cache=use_cache and not avoid_repeats,
+            on_question=report,
+            existing=[dict(q, from_bank=True) for q in banked],
+            accept=lambda question: accept(idx, question),
+            on_surplus=lambda q: bank.add(q, corpus, section["q_type"], section["q_marks"], used=False),
+            cancel_event=cancel_event
+        )
+
+    def store_questions(idx, questions):
+        section = section_data[idx]
+        section["questions"] = [
+            dict(q, marks=section["q_marks"], type=section["q_type"])
+            for q in questions
+        ]
+        section["shortfall"] = max(0, section["num_questions"] - len(questions))
+        for question in questions:
+            if not question.get("from_bank"):
+                bank.add(question, corpus, section["q_type"], section["q_marks"])
+        if on_section_done is not None:
+            on_section_done(idx, section)
+
+    # Generate all sections concurrently; each is stored as soon as it finishes
+    run_sections(
+        list(zip(range(len(section_data)), section_data, section_contexts)),
+        generate_section,
+        on_result=store_questions,
+        cancel_event=cancel_event
+    )
+    return section_data
@@ -0,0 +1,143 @@
+"""Plain-text markup for editing a rendered question paper.
+
+A paper looks like this, with header fields first, then notes, then
+sections of numbered questions whose marks close the first line:
+
+    School: Springfield High
+    Exam: Term 1
+    Notes:
+    - All questions are compulsory
+    ## Section A
+    Q1. Which gas do plants absorb? [1 marks]
+    A) Oxygen
+    B) Carbon dioxide
+
+The same structure is read back from the Word file the app generates, so
+edits made in either form render to PDF with the regular templates.
+"""
+import io
+import re
+
+import docx
+
+from paper_model import parse_question
+from question_parser import clean_stem, format_question
+
+HEADER_LABELS = (
+    ("school_name", "School"),
+    ("exam_name", "Exam"),
+    ("class_name", "Class"),
+    ("subject", "Subject"),
+    ("time", "Time"),
+    ("max_marks", "Maximum Marks"),
+)
+SECTION_PREFIX = "## "
+QUESTION_PREFIX_RE = re.compile(r"^Q\d+\.\s*")
+MARKS_RE = re.compile(r"\s*\[\s*([^\]]*?)\s*marks?\]\s*$")
+
+
+def empty_paper():
+    paper = {field: "" for field, _ in HEADER_LABELS}
+    paper.update(notes=[], sections=[])
+    return paper
+
+
+def _make_question(lines, number):
+    lines = list(lines)
+    marks = ""
+    for i, line in enumerate(lines):
+        # Marks normally close the first line, but an edit may move them down
+        match = MARKS_RE.search(line)
+        if match:
+            lines[i], marks = line[:match.start()], match.group(1)
+            break
+    lines[0] = clean_stem(QUESTION_PREFIX_RE.sub('', lines[0]))
+    parts = parse_question('\n'.join(lines))
+    return dict(format_question(parts, number), marks=marks)
+
+
+def markup_to_paper(text):
+    """Parse edited markup into header fields, notes and sections of questions."""
+    labels = {f"{label}:": field for field, label in HEADER_LABELS}
+    paper = empty_paper()
+    in_notes = False
+    section = None
+    question_lines = []
+
+    def flush_question():
+        if question_lines:
+            section["questions"].append(_make_question(question_lines, len(section["questions"]) + 1))
+            question_lines.clear()
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith(SECTION_PREFIX.strip()):
+            if section is not None:
+                flush_question()
+            section = {"section_name": stripped.lstrip("#").strip(), "questions": []}
+            paper["sections"].append(section)
+            continue
+        if section is None:
+            label = next((key for key in labels if stripped.startswith(key)), None)
+            if label:
+                paper[labels[label]] = stripped[len(label):].strip()
+                in_notes = False
+                continue
+            if stripped == "Notes:":
+                in_notes = True
+                continue
+            if in_notes and stripped.startswith("- "):
+                paper["notes"].append(stripped[2:].strip())
+                continue
+            # Loose text before the first section still belongs to the paper
+            section = {"section_name": "", "questions": []}
+            paper["sections"].append(section)
+        if QUESTION_PREFIX_RE.match(stripped):
+            flush_question()
+        question_lines.append(stripped)
+    if section is not None:
+        flush_question()
+    return paper
+
+
+def paper_to_markup(paper):
+    lines = [f"{label}: {paper.get(field) or ''}" for field, label in HEADER_LABELS]
+    if paper.get("notes"):
+        lines.append("Notes:")
+        lines.extend(f"- {note}" for note in paper["notes"])
+    for section in paper.get("sections", []):
+        lines.append(f"{SECTION_PREFIX}{section['section_name']}")
+        for idx, question in enumerate(section["questions"], 1):
+            stem_lines = clean_stem(question["stem"]).split('\n')
+            lines.append(f"Q{idx}. {stem_lines[0]} [{question.get('marks', '')} marks]")
+            lines.extend(stem_lines[1:])
+            lines.extend(f"{option['label']}) {option['text']}" for option in question.get("options", []))
+    return '\n'.join(lines)
+
+
+def docx_to_markup(data):
+    """Convert a Word file written by create_question_paper_docx to markup.
+
+    Paragraph styles carry the structure; paragraphs the app did not write
+    are kept as plain lines.
+    """
+    lines = []
+    for para in docx.Document(io.BytesIO(data)).paragraphs:
+        style = para.style.name if para.style is not None else ""
+        if style == "Title":
+            lines.append(f"School: {para.text}")
+        elif style.startswith("Heading"):
+            lines.append(f"{SECTION_PREFIX}{para.text}")
+        elif style == "List Bullet":
+            lines.append(f"- {para.text}")
+        else:
+            text = para.text
+            match = MARKS_RE.search(text)
+            if match:
+                # The marks run follows the options; markup keeps marks on the first line
+                first, *rest = text[:match.start()].split('\n')
+                text = '\n'.join([f"{first} [{match.group(1)} marks]"] + rest)
+            lines.append(text)
+    return '\n'.join(lines)
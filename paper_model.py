@@ -0,0 +1,60 @@
+import re
+
+# Option lines such as "A) text", "(b) text", "C. text" or "D: text"
+OPTION_RE = re.compile(r"^\(?([A-Da-d])[).:]\s+(.*)$")
+TYPE_TAGS = ('[MCQ]', '[Short]', '[Long]')
+
+
+def _clean(line):
+    for tag in TYPE_TAGS:
+        line = line.replace(tag, '')
+    return line.rstrip()
+
+
+def parse_question(text):
+    """Split raw question text into stem, options and answer.
+
+    Returns a dict with 'stem' (str, may span lines), 'options' (list of
+    {'label', 'text'}) and 'answer' (the text after 'Answer:', or '').
+    """
+    stem_lines = []
+    options = []
+    answer = ''
+    for line in text.split('\n'):
+        line = _clean(line)
+        stripped = line.strip()
+        if stripped.lower().startswith('answer:'):
+            answer = stripped.split(':', 1)[1].strip()
+            continue
+        match = OPTION_RE.match(stripped)
+        if match and stem_lines:
+            options.append({"label": match.group(1).upper(), "text": match.group(2).strip()})
+        elif options and stripped:
+            # Wrapped option text belongs to the option above it
+            options[-1]["text"] += "\n" + stripped
+        elif stripped or stem_lines:
+            stem_lines.append(line)
+    return {"stem": '\n'.join(stem_lines).strip(), "options": options, "answer": answer}
+
+
+def question_parts(question):
+    # Questions structured by structure_sections are used as is; older dicts are parsed on the fly
+    if "stem" in question:
+        return question
+    return parse_question(question.get('text', ''))
+
+
+def question_lines(question):
+    parts = question_parts(question)
+    lines = parts["stem"].split('\n') if parts["stem"] else []
+    lines.extend(f"{option['label']}) {option['text']}" for option in parts["options"])
+    return lines
+
+
+def structure_sections(section_data):
+    """Parse every question once, adding stem/options/answer alongside its text."""
+    for section in section_data:
+        for question in section.get('questions', []):
+            if "stem" not in question:
+                question.update(parse_question(question.get('text', '')))
+    return section_data
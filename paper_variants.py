@@ -0,0 +1,97 @@
+import io
+import random
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_sheet_template import create_answer_sheet_pdf
+from paper_model import question_parts, structure_sections
+from question_paper_template import create_question_paper_pdf
+from question_parser import OPTION_LABELS, clean_stem, format_question
+
+# Leading option letter of an answer such as "B", "b)", "(C) text" or "D. text"
+ANSWER_LETTER_RE = re.compile(r"^\s*\(?([A-D]|[a-d](?=[).:]))(?=[).:\s]|$)")
+
+
+def set_label(index):
+    """Spreadsheet-style set names: A..Z, then AA, AB, ..."""
+    label = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+
+def shuffle_question(question, number, rng):
+    """Renumber a question and shuffle its options, remapping the answer letter."""
+    parts = question_parts(question)
+    options = list(parts["options"])
+    answer = parts["answer"]
+    if options:
+        order = list(range(len(options)))
+        rng.shuffle(order)
+        old_labels = [option["label"] for option in options]
+        new_labels = OPTION_LABELS[:len(options)]
+        options = [{"label": new_labels[i], "text": options[old]["text"]} for i, old in enumerate(order)]
+        match = ANSWER_LETTER_RE.match(answer)
+        if match and match.group(1).upper() in old_labels:
+            new_label = new_labels[order.index(old_labels.index(match.group(1).upper()))]
+            answer = answer[:match.start(1)] + new_label + answer[match.end(1):]
+    shuffled = dict(question, stem=clean_stem(parts["stem"]), options=options, answer=answer)
+    return format_question(shuffled, number)
+
+
+def shuffle_sections(section_data, rng):
+    """Copy of section_data with questions and MCQ options shuffled within each section."""
+    variant = []
+    for section in section_data:
+        questions = list(section.get("questions", []))
+        rng.shuffle(questions)
+        variant.append(dict(section, questions=[
+            shuffle_question(question, number, rng) for number, question in enumerate(questions, 1)
+        ]))
+    return variant
+
+
+def _render_set(section_data, index, seed, header, notes):
+    # Each set has its own generator so results don't depend on thread scheduling
+    variant = shuffle_sections(section_data, random.Random(f"{seed}:{index}"))
+    exam_name = f"{header.get('exam_name') or ''} (Set {set_label(index)})".strip()
+    header = dict(header, exam_name=exam_name)
+    return {
+        "question_paper": create_question_paper_pdf(
+            paper_name=exam_name, questions_by_section=variant, total_marks=header.get("max_marks"),
+            notes=notes, **header
+        ),
+        "answer_sheet": create_answer_sheet_pdf(paper_name=exam_name, questions_by_section=variant, **header),
+    }
+
+
+def render_variants(section_data, num_sets, seed=0, exam_name='', school_name='', class_name='', subject='',
+                    time='', notes=None, max_marks='', max_workers=4):
+    """Render num_sets shuffled question paper/answer sheet pairs from generated questions.
+
+    No model calls are made. The same seed always produces the same sets.
+    Returns a list of (set label, {'question_paper', 'answer_sheet'}) in
+    set order.
+    """
+    structure_sections(section_data)
+    header = dict(school_name=school_name, exam_name=exam_name, class_name=class_name,
+                  subject=subject, time=time, max_marks=max_marks)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_render_set, section_data, index, seed, header, notes)
+            for index in range(num_sets)
+        ]
+        return [(set_label(index), future.result()) for index, future in enumerate(futures)]
+
+
+def variants_zip(variants, base_name="QuestionPaper"):
+    """Bundle rendered sets into one zip archive, returned as bytes."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for label, files in variants:
+            archive.writestr(f"{base_name} - Set {label}.pdf", files["question_paper"])
+            archive.writestr(f"{base_name} - Set {label} - Answers.pdf", files["answer_sheet"])
+    return buffer.getvalue()
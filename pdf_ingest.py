@@ -0,0 +1,107 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from PyPDF2 import PdfReader
+
+from cache_config import cache_dir
+from upload_store import open_mapped, upload_store
+
+# Number of parsed documents kept in memory; older ones are still on disk
+MEMORY_CACHE_SIZE = int(os.getenv("PAPERMAKER_TEXT_CACHE_SIZE", "16"))
+
+_pages_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def read_pdf_bytes(pdf):
+    # Accepts Streamlit UploadedFile objects, other file-like objects and paths
+    if isinstance(pdf, (str, os.PathLike)):
+        with open(pdf, "rb") as f:
+            return f.read()
+    if hasattr(pdf, "getvalue"):
+        return pdf.getvalue()
+    pdf.seek(0)
+    data = pdf.read()
+    pdf.seek(0)
+    return data
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def extract_pages(data):
+    # Memory-mapped files are read in place instead of being copied
+    reader = PdfReader(data if isinstance(data, mmap.mmap) else io.BytesIO(data))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def _disk_path(digest):
+    return os.path.join(cache_dir("pages"), f"{digest}.json")
+
+
+def _remember(digest, pages):
+    with _cache_lock:
+        _pages_cache[digest] = pages
+        _pages_cache.move_to_end(digest)
+        while len(_pages_cache) > MEMORY_CACHE_SIZE:
+            _pages_cache.popitem(last=False)
+
+
+def _load_from_disk(digest):
+    try:
+        with open(_disk_path(digest), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_to_disk(digest, pages):
+    path = _disk_path(digest)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # The disk cache is best effort; the in-memory copy is still valid
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_pages_by_hash(digest, data):
+    with _cache_lock:
+        pages = _pages_cache.get(digest)
+        if pages is not None:
+            _pages_cache.move_to_end(digest)
+            return pages
+    pages = _load_from_disk(digest)
+    if pages is None:
+        pages = extract_pages(data)
+        _save_to_disk(digest, pages)
+    _remember(digest, pages)
+    return pages
+
+
+def get_pdf_pages(pdf):
+    """Return (sha256, pages) for one PDF, parsing it only on a cache miss.
+
+    Paths are memory-mapped rather than read; files from the upload store
+    are named by their hash, so they aren't hashed again.
+    """
+    if isinstance(pdf, (str, os.PathLike)):
+        with open_mapped(pdf) as data:
+            digest = upload_store.digest_for_path(pdf) or hash_bytes(data)
+            return digest, get_pages_by_hash(digest, data)
+    data = read_pdf_bytes(pdf)
+    digest = hash_bytes(data)
+    return digest, get_pages_by_hash(digest, data)
+
+
+def get_document_pages(pdf_docs):
+    return [get_pdf_pages(pdf) for pdf in pdf_docs]
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+
+from question_parser import clean_stem
+
+# Kept with the project like chroma_db, not in the temp-dir cache, so it outlives reboots and terms
+QUESTION_BANK_PATH = os.getenv("PAPERMAKER_QUESTION_BANK", "question_bank.sqlite")
+
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows puts the LSH candidate threshold near a Jaccard similarity of 0.42
+LSH_BANDS = 32
+# Estimated Jaccard similarity of stem shingles above which two questions count as duplicates
+DUPLICATE_THRESHOLD = float(os.getenv("PAPERMAKER_DUPLICATE_THRESHOLD", "0.7"))
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1234)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def normalize_text(text):
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+
+def minhash_signature(text):
+    """MinHash signature of the character shingles of a normalised question stem."""
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class MinHashIndex:
+    """In-memory LSH index over MinHash signatures for near-duplicate lookup."""
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._rows = NUM_PERMUTATIONS // LSH_BANDS
+        self._buckets = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def _bands(self, signature):
+        for band in range(LSH_BANDS):
+            yield band, tuple(signature[band * self._rows:(band + 1) * self._rows])
+
+    def add(self, key, signature):
+        with self._lock:
+            self._signatures[key] = signature
+            for band in self._bands(signature):
+                self._buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            signature = self._signatures.pop(key, None)
+            if signature is None:
+                return
+            for band in self._bands(signature):
+                self._buckets.get(band, set()).discard(key)
+
+    def find(self, signature, among=None):
+        """Return the key of the most similar entry at or above the threshold, or None.
+
+        among, if given, limits the search to those keys.
+        """
+        with self._lock:
+            candidates = set()
+            for band in self._bands(signature):
+                candidates.update(self._buckets.get(band, ()))
+            if among is not None:
+                candidates = {key for key in candidates if key in among}
+            best, best_score = None, self.threshold
+            for key in candidates:
+                score = estimated_similarity(signature, self._signatures[key])
+                if score >= best_score:
+                    best, best_score = key, score
+            return best
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+class QuestionBank:
+    """Persistent store of generated questions with a near-duplicate index.
+
+    Every question is stored with its source corpus, type and marks. Stems
+    are stored without their numbering.
+    """
+
+    def __init__(self, path=None, threshold=DUPLICATE_THRESHOLD):
+        self.path = path or QUESTION_BANK_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, corpus TEXT, q_type TEXT, marks TEXT, "
+            "stem TEXT, options TEXT, answer TEXT, difficulty TEXT, signature BLOB, "
+            "created REAL, times_used INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS questions_lookup ON questions (corpus, q_type, times_used)")
+        self._conn.commit()
+        self.index = MinHashIndex(threshold)
+        # Ids of questions that have appeared in a paper; surplus questions never have
+        self._used = set()
+        for key, blob, times_used in self._conn.execute("SELECT id, signature, times_used FROM questions"):
+            self.index.add(key, array("q", blob).tolist())
+            if times_used:
+                self._used.add(key)
+
+    def find_used(self, signature):
+        """The id of a near-duplicate that has already appeared in a paper, or None."""
+        return self.index.find(signature, among=self._used)
+
+    def add(self, question, corpus, q_type, marks, used=True):
+        """Store a question unless a near-duplicate is already banked; returns its id."""
+        stem = clean_stem(question["stem"])
+        signature = minhash_signature(stem)
+        existing = self.index.find(signature)
+        if existing is not None:
+            if used:
+                with self._lock:
+                    self._conn.execute("UPDATE questions SET times_used = times_used + 1 WHERE id = ?", (existing,))
+                    self._conn.commit()
+                    self._used.add(existing)
+            return existing
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO questions (corpus, q_type, marks, stem, options, answer, difficulty, signature, created, times_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (corpus, q_type, str(marks), stem, json.dumps(question.get("options", [])),
+                 question.get("answer", ""), question.get("difficulty", ""),
+                 array("q", signature).tobytes(), time.time(), 1 if used else 0)
+            )
+            self._conn.commit()
+            key = cursor.lastrowid
+            if used:
+                self._used.add(key)
+        self.index.add(key, signature)
+        return key
+
+    def take_unused(self, corpus, q_type, count):
+        """Return up to count never-used questions for corpus and type, marking them used.
+
+        Each carries its row id as "bank_id".
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, stem, options, answer, difficulty FROM questions "
+                "WHERE corpus = ? AND q_type = ? AND times_used = 0 ORDER BY created LIMIT ?",
+                (corpus, q_type, count)
+            ).fetchall()
+            self._conn.executemany("UPDATE questions SET times_used = times_used + 1 WHERE id = ?", [(row[0],) for row in rows])
+            self._conn.commit()
+            self._used.update(row[0] for row in rows)
+        return [
+            {"bank_id": key, "stem": stem, "options": json.loads(options), "answer": answer, "difficulty": difficulty}
+            for key, stem, options, answer, difficulty in rows
+        ]
+
+    def give_back(self, questions):
+        """Return questions from take_unused to the unused pool, e.g. when their paper failed."""
+        ids = [question["bank_id"] for question in questions]
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE questions SET times_used = times_used - 1 WHERE id = ? AND times_used > 0",
+                [(key,) for key in ids]
+            )
+            self._conn.commit()
+            for key in ids:
+                row = self._conn.execute("SELECT times_used FROM questions WHERE id = ?", (key,)).fetchone()
+                if row is not None and not row[0]:
+                    self._used.discard(key)
+
+
+_question_bank = None
+_question_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    global _question_bank
+    with _question_bank_lock:
+        if _question_bank is None:
+            _question_bank = QuestionBank()
+        return _question_bank
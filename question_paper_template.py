@@ -1,15 +1,15 @@
 from fpdf import FPDF
-import os
+from fpdf_utils import add_unicode_font, finish_pdf
+from paper_model import question_lines
 
 def create_question_paper_pdf(
-    paper_name, questions_by_section, total_marks, output_path,
+    paper_name, questions_by_section, total_marks, output_path=None,
     school_name=None, exam_name=None, class_name=None, subject=None, time=None, notes=None, max_marks=None
 ):
     pdf = FPDF()
     pdf.add_page()
     # Use a Unicode font (NotoSansMath) for full math symbol support
-    font_path_math = os.path.join(os.path.dirname(__file__), "NotoSansMath-Regular.ttf")
-    pdf.add_font('NotoSansMath', '', font_path_math, uni=True)
+    add_unicode_font(pdf)
     pdf.set_font('NotoSansMath', '', 14)
 
     margin = 15
@@ -60,14 +60,9 @@ def create_question_paper_pdf(
         pdf.cell(page_width, 10, txt=section_name, ln=True, align='C')
         pdf.set_font('NotoSansMath', '', 12)
         for q in questions:
-            q_text = q.get('text', '')
             q_marks = q.get('marks', '')
-            # Remove answer lines and [MCQ]/[Short]/[Long] from question text
-            q_text_no_answer = '\n'.join([
-                line.replace('[MCQ]', '').replace('[Short]', '').replace('[Long]', '').rstrip()
-                for line in q_text.split('\n') if not line.strip().lower().startswith('answer:')
-            ])
-            lines = q_text_no_answer.split('\n')
+            # Stem and options only; answers go on the answer sheet
+            lines = question_lines(q)
             y = pdf.get_y()
             pdf.set_xy(margin, y)
             start_y = pdf.get_y()
@@ -86,5 +81,4 @@ def create_question_paper_pdf(
                     pdf.multi_cell(page_width-40, 8, line, align='L')
             pdf.ln(2)
         pdf.ln(6)
-    pdf.output(output_path)
-    return output_path
+    return finish_pdf(pdf, output_path)
@@ -0,0 +1,216 @@
+import json
+import re
+
+from paper_model import parse_question
+
+# "1.", "12)", "Q3.", "Q 3:", "Question 4:" or "**5.**" at the start of a line
+QUESTION_START_RE = re.compile(r"^\s*(?:\*\*)?(?:Q(?:uestion)?\s*\d+\s*(?:[.):]|\s)|\d+\s*[.)](?!\d))(?:\*\*)?")
+OPTION_LABELS = ("A", "B", "C", "D")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+class QuestionStreamParser:
+    """Splits model output into questions while it is still streaming.
+
+    feed() returns the questions completed by the new text: an MCQ is
+    complete at its 'Answer:' line or when the next question starts, other
+    types at the end of their numbered line. close() flushes the rest.
+    """
+
+    def __init__(self, output_format):
+        self.output_format = output_format
+        self._buffer = ""
+        self._current = []
+        self._lines = []
+        self._found_question = False
+
+    def feed(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        completed = []
+        for line in lines:
+            completed.extend(self._add_line(line))
+        return completed
+
+    def close(self):
+        completed = []
+        if self._buffer:
+            completed.extend(self._add_line(self._buffer))
+            self._buffer = ""
+        if self.output_format == "MCQ":
+            completed.extend(self._flush(force=not self._found_question))
+        elif not self._found_question:
+            # No numbered lines at all: fall back to every line
+            completed = [line for line in self._lines if line.strip()]
+        return completed
+
+    def _add_line(self, line):
+        self._lines.append(line)
+        stripped = line.strip()
+        starts_question = bool(QUESTION_START_RE.match(stripped))
+        if self.output_format != "MCQ":
+            if starts_question:
+                self._found_question = True
+                return [stripped]
+            return []
+        completed = []
+        if starts_question:
+            # Text before the first numbered question is preamble and is dropped
+            completed.extend(self._flush())
+            self._found_question = True
+        self._current.append(line)
+        if stripped.lower().startswith('answer:') and self._found_question:
+            completed.extend(self._flush())
+        return completed
+
+    def _flush(self, force=False):
+        text = '\n'.join(self._current).strip()
+        self._current = []
+        if text and (self._found_question or force):
+            return [text]
+        return []
+
+
+def parse_questions(response_text, output_format):
+    parser = QuestionStreamParser(output_format)
+    return parser.feed(response_text) + parser.close()
+
+
+class JsonObjectStream:
+    """Yields each top-level JSON object in a stream as soon as it closes.
+
+    Surrounding text such as the enclosing array, code fences or commentary
+    is ignored; objects that fail to decode are yielded as None.
+    """
+
+    def __init__(self):
+        self._chars = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        objects = []
+        for ch in text:
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._chars = ['{']
+                continue
+            self._chars.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads(''.join(self._chars)))
+                    except ValueError:
+                        objects.append(None)
+                    self._chars = []
+        return objects
+
+
+def clean_stem(stem):
+    # Numbering is added when the question is placed in its section
+    return QUESTION_START_RE.sub('', stem, count=1).strip()
+
+
+def validate_question(obj, output_format):
+    """Check one question object against the schema and normalise it.
+
+    Returns {'stem', 'options', 'answer', 'difficulty'} or None if invalid.
+    MCQs need exactly options A-D and an answer letter among them.
+    """
+    if not isinstance(obj, dict):
+        return None
+    stem = obj.get("stem", obj.get("question"))
+    if not isinstance(stem, str) or not clean_stem(stem):
+        return None
+    difficulty = str(obj.get("difficulty", "")).strip().lower()
+    if difficulty not in DIFFICULTIES:
+        difficulty = ""
+    answer = obj.get("answer", "")
+    answer = str(answer).strip() if isinstance(answer, (str, int, float)) else ""
+    options = []
+    if output_format == "MCQ":
+        raw_options = obj.get("options")
+        if isinstance(raw_options, list) and len(raw_options) == len(OPTION_LABELS):
+            raw_options = dict(zip(OPTION_LABELS, raw_options))
+        if not isinstance(raw_options, dict):
+            return None
+        raw_options = {str(k).strip().strip('().').upper(): v for k, v in raw_options.items()}
+        if set(raw_options) != set(OPTION_LABELS):
+            return None
+        for label in OPTION_LABELS:
+            text = raw_options[label]
+            if not isinstance(text, str) or not text.strip():
+                return None
+            options.append({"label": label, "text": text.strip()})
+        answer = answer.strip('(').upper()[:1]
+        if answer not in OPTION_LABELS:
+            return None
+    return {"stem": clean_stem(stem), "options": options, "answer": answer, "difficulty": difficulty}
+
+
+class StructuredQuestionParser:
+    """Parses a (streamed) JSON array of question objects.
+
+    feed() returns the valid questions completed by the new text and
+    counts invalid ones in self.invalid. If the response contains no JSON
+    objects at all, close() falls back to the numbered-text parser.
+    """
+
+    def __init__(self, output_format):
+        self.output_format = output_format
+        self.invalid = 0
+        self._objects = JsonObjectStream()
+        self._seen_objects = False
+        self._text = []
+
+    def feed(self, text):
+        self._text.append(text)
+        questions = []
+        for obj in self._objects.feed(text):
+            self._seen_objects = True
+            question = validate_question(obj, self.output_format)
+            if question is None:
+                self.invalid += 1
+            else:
+                questions.append(question)
+        return questions
+
+    def close(self):
+        if self._seen_objects:
+            return []
+        questions = []
+        for text in parse_questions(''.join(self._text), self.output_format):
+            parts = parse_question(text)
+            parts["stem"] = clean_stem(parts["stem"])
+            if parts["stem"]:
+                parts["difficulty"] = ""
+                questions.append(parts)
+        return questions
+
+
+def format_question(question, number):
+    """Number a structured question and render its text form.
+
+    The text keeps the layout older code expects: numbered stem, lettered
+    options and a final 'Answer:' line.
+    """
+    stem = f"{number}. {question['stem']}"
+    lines = [stem]
+    lines.extend(f"{option['label']}) {option['text']}" for option in question["options"])
+    if question["answer"]:
+        lines.append(f"Answer: {question['answer']}")
+    return dict(question, stem=stem, text='\n'.join(lines))
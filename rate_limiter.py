@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every LLM call in the process.
+
+    A rate of 0 disables limiting.
+    """
+
+    def __init__(self, calls_per_minute=0, burst=None):
+        self._lock = threading.Lock()
+        self.set_rate(calls_per_minute, burst)
+
+    def set_rate(self, calls_per_minute, burst=None):
+        with self._lock:
+            self.calls_per_minute = calls_per_minute
+            self.capacity = burst or max(1, int(calls_per_minute // 60) or 1)
+            self.tokens = self.capacity
+            self.updated = time.monotonic()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if self.calls_per_minute <= 0:
+                    return
+                now = time.monotonic()
+                rate = self.calls_per_minute / 60.0
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / rate
+            time.sleep(wait)
+
+
+llm_rate_limiter = RateLimiter(float(os.getenv("PAPERMAKER_LLM_RPM", "0")))
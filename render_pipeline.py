@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_sheet_template import create_answer_sheet_pdf
+from docx_template import create_question_paper_docx
+from paper_model import structure_sections
+from question_paper_template import create_question_paper_pdf
+from tracing import bind, span
+
+
+def render_paper(section_data, exam_name='', school_name='', class_name='', subject='', time='', notes=None, max_marks=''):
+    """Render the question paper PDF, answer sheet PDF and DOCX in memory.
+
+    Questions are parsed once up front and the three renderers run
+    concurrently. Returns a dict of bytes keyed by 'question_paper',
+    'answer_sheet' and 'docx'.
+    """
+    structure_sections(section_data)
+    header = dict(school_name=school_name, exam_name=exam_name, class_name=class_name,
+                  subject=subject, time=time, max_marks=max_marks)
+
+    def render(name, renderer, **kwargs):
+        with span(f"render.{name}"):
+            return renderer(**kwargs)
+
+    with span("render"), ThreadPoolExecutor(max_workers=3) as pool:
+        futures = {
+            "question_paper": pool.submit(
+                bind(render), "question_paper", create_question_paper_pdf, paper_name=exam_name,
+                questions_by_section=section_data, total_marks=max_marks, notes=notes, **header
+            ),
+            "answer_sheet": pool.submit(
+                bind(render), "answer_sheet", create_answer_sheet_pdf, paper_name=exam_name,
+                questions_by_section=section_data, **header
+            ),
+            "docx": pool.submit(
+                bind(render), "docx", create_question_paper_docx, paper_name=exam_name,
+                questions_by_section=section_data, total_marks=max_marks, notes=notes, **header
+            ),
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def render_edited_paper(paper):
+    """Render a paper parsed by paper_markup to question paper PDF and DOCX bytes."""
+    header = {field: paper.get(field, '') for field in
+              ("school_name", "exam_name", "class_name", "subject", "time", "max_marks")}
+    kwargs = dict(paper_name=header["exam_name"], questions_by_section=paper["sections"],
+                  total_marks=header["max_marks"], notes=paper.get("notes"), **header)
+    return {
+        "question_paper": create_question_paper_pdf(**kwargs),
+        "docx": create_question_paper_docx(**kwargs),
+    }
@@ -0,0 +1,101 @@
+import os
+import threading
+from collections import OrderedDict
+
+from corpus_store import collection_name, corpus_path, registry
+from lexical_index import BM25Index, index_path
+from vector_index import EMBEDDING_MODEL
+
+CHAT_MODEL = "gemini-2.0-flash"
+# Open Chroma clients kept per process; each holds file handles for one corpus
+MAX_OPEN_STORES = 8
+
+# Clients live for the whole process, so Streamlit reruns, chat and
+# generation all reuse the same warm objects and connection pools
+_resources = {}
+_stores = OrderedDict()
+_lexical_indexes = OrderedDict()
+_lock = threading.RLock()
+
+
+def get_resource(key, factory):
+    with _lock:
+        if key not in _resources:
+            _resources[key] = factory()
+        return _resources[key]
+
+
+def configure_google_api():
+    def configure():
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        return genai
+    return get_resource("genai", configure)
+
+
+def get_chat_model(model=CHAT_MODEL, temperature=0.3):
+    def create():
+        configure_google_api()
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=model, temperature=temperature)
+    return get_resource(("chat", model, temperature), create)
+
+
+def get_embeddings(model=EMBEDDING_MODEL):
+    def create():
+        configure_google_api()
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model=model)
+    return get_resource(("embeddings", model), create)
+
+
+def get_corpus_store(corpus):
+    with _lock:
+        store = _stores.get(corpus)
+        if store is None:
+            from langchain.vectorstores import Chroma
+            store = Chroma(
+                collection_name=collection_name(corpus),
+                persist_directory=corpus_path(corpus),
+                embedding_function=get_embeddings()
+            )
+            _stores[corpus] = store
+            while len(_stores) > MAX_OPEN_STORES:
+                _stores.popitem(last=False)
+        _stores.move_to_end(corpus)
+        return store
+
+
+def set_corpus_store(corpus, store):
+    """Serve corpus from store instead of its Chroma directory, e.g. an in-memory store in the benchmark."""
+    with _lock:
+        _stores[corpus] = store
+        _stores.move_to_end(corpus)
+        while len(_stores) > MAX_OPEN_STORES:
+            _stores.popitem(last=False)
+
+
+def get_lexical_index(corpus):
+    """The corpus's BM25 index, loaded once per process; None if it was never built."""
+    with _lock:
+        index = _lexical_indexes.get(corpus)
+        if index is None:
+            try:
+                index = BM25Index.load(index_path(corpus))
+            except (OSError, ValueError):
+                return None
+            _lexical_indexes[corpus] = index
+            while len(_lexical_indexes) > MAX_OPEN_STORES:
+                _lexical_indexes.popitem(last=False)
+        _lexical_indexes.move_to_end(corpus)
+        return index
+
+
+def drop_corpus_store(corpus):
+    with _lock:
+        _stores.pop(corpus, None)
+        _lexical_indexes.pop(corpus, None)
+
+
+# An evicted corpus directory must not be served from a stale client
+registry.on_evict(drop_corpus_store)
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lexical_index import reciprocal_rank_fusion
+from resources import get_corpus_store, get_lexical_index
+from tracing import bind, span
+
+# Vector search waits this long for the embedding call before answering from BM25 alone
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("PAPERMAKER_VECTOR_TIMEOUT", "3"))
+# After a slow or failed vector search, skip it for this long and answer lexically
+VECTOR_COOLDOWN_SECONDS = float(os.getenv("PAPERMAKER_VECTOR_COOLDOWN", "30"))
+# Each retriever contributes this many candidates per requested result to the fusion
+CANDIDATES_PER_RESULT = 2
+
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="papermaker-search")
+_vector_state = {"skip_until": 0.0}
+_state_lock = threading.Lock()
+
+
+def _vector_available():
+    with _state_lock:
+        return time.monotonic() >= _vector_state["skip_until"]
+
+
+def _vector_failed():
+    with _state_lock:
+        _vector_state["skip_until"] = time.monotonic() + VECTOR_COOLDOWN_SECONDS
+
+
+def hybrid_search(query, corpus, k=4, timeout=VECTOR_SEARCH_TIMEOUT):
+    """Return up to k chunk texts for query, fusing BM25 and vector results.
+
+    The vector search (which needs an embedding call) runs on a worker
+    while BM25 scores locally. If it is slow, fails, or failed recently,
+    the lexical results are returned on their own.
+    """
+    with span("retrieve", k=k) as search:
+        lexical = get_lexical_index(corpus)
+        candidates = k * CANDIDATES_PER_RESULT
+        vector_future = None
+        if lexical is None or _vector_available():
+            store = get_corpus_store(corpus)
+
+            def vector_search():
+                with span("retrieve.vector"):
+                    return [doc.page_content for doc in store.similarity_search(query, k=candidates)]
+
+            vector_future = _pool.submit(bind(vector_search))
+        rankings = []
+        if lexical is not None:
+            rankings.append(lexical.search_texts(query, candidates))
+        if vector_future is not None:
+            try:
+                # Without a lexical index there is nothing to fall back to, so wait
+                rankings.append(vector_future.result(timeout=timeout if lexical is not None else None))
+            except Exception:
+                if lexical is None:
+                    raise
+                _vector_failed()
+                vector_future = None
+        search.set(lexical=lexical is not None, vector=vector_future is not None)
+        return reciprocal_rank_fusion(rankings)[:k]
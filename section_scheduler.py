@@ -0,0 +1,139 @@
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+
+from tracing import bind, count, span
+
+# Defaults for section generation; override through the environment
+MAX_CONCURRENCY = int(os.getenv("PAPERMAKER_MAX_CONCURRENCY", "4"))
+CALL_TIMEOUT = float(os.getenv("PAPERMAKER_LLM_TIMEOUT", "120"))
+MAX_RETRIES = int(os.getenv("PAPERMAKER_LLM_RETRIES", "2"))
+BACKOFF_SECONDS = float(os.getenv("PAPERMAKER_LLM_BACKOFF", "1.0"))
+
+
+def call_with_timeout(fn, timeout=None):
+    if not timeout:
+        return fn()
+    result = {}
+
+    def target():
+        try:
+            result["value"] = fn()
+        except BaseException as e:
+            result["error"] = e
+
+    # A daemon thread lets us give up on a hung call without blocking shutdown
+    worker = threading.Thread(target=bind(target), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"LLM call did not finish within {timeout} seconds")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def iter_with_timeout(iterable, timeout=None):
+    """Yield from iterable, raising TimeoutError if it has not finished within timeout seconds.
+
+    The iterable is consumed on a daemon thread, which stops at its next
+    item once the caller has given up.
+    """
+    if not timeout:
+        yield from iterable
+        return
+    items = queue.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                items.put((True, item))
+            else:
+                items.put((False, None))
+        except BaseException as e:
+            items.put((False, e))
+        finally:
+            close = getattr(iterable, "close", None)
+            if stop.is_set() and close is not None:
+                close()
+
+    threading.Thread(target=bind(produce), daemon=True).start()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                more, value = items.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"LLM call did not finish within {timeout} seconds") from None
+            if not more:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stop.set()
+
+
+def check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError("Section generation was cancelled")
+
+
+def call_with_retries(fn, retries=MAX_RETRIES, timeout=CALL_TIMEOUT, backoff=BACKOFF_SECONDS, cancel_event=None):
+    for attempt in range(retries + 1):
+        check_cancelled(cancel_event)
+        try:
+            return call_with_timeout(fn, timeout)
+        except CancelledError:
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            count("retries")
+            # Exponential backoff with jitter so parallel sections don't retry in lockstep
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            if cancel_event is not None:
+                cancel_event.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+def run_sections(section_data, generate_section, max_concurrency=MAX_CONCURRENCY,
+                 on_result=None, cancel_event=None):
+    """Call generate_section(section) for every section concurrently.
+
+    on_result(index, result) is called as each section finishes. Setting
+    cancel_event stops sections that have not started yet; pass it on to
+    generate_section to stop running ones as well. Results are
+    returned in the same order as section_data. Timeouts and retries
+    belong to the individual model calls inside generate_section.
+    """
+    if not section_data:
+        return []
+
+    def task(index, section):
+        check_cancelled(cancel_event)
+        with span("section", index=index):
+            return generate_section(section)
+
+    workers = max(1, min(max_concurrency, len(section_data)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(bind(task), idx, section) for idx, section in enumerate(section_data)]
+        index_of = {future: idx for idx, future in enumerate(futures)}
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if on_result is not None:
+                    on_result(index_of[future], result)
+        except BaseException:
+            # One failed section fails the paper; don't spend calls on the rest
+            for future in futures:
+                future.cancel()
+            raise
+        return [future.result() for future in futures]
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import llm_cache
+import paper_generator
+from fake_llm import FakeChatModel
+
+
+class InvalidMCQModel(FakeChatModel):
+    """Answers every prompt with MCQs that have no options."""
+
+    def _answer(self, prompt):
+        return json.dumps([{"stem": "Which gas do plants take in?", "answer": "A", "difficulty": "easy"}])
+
+
+@pytest.fixture(autouse=True)
+def response_cache(tmp_path, monkeypatch):
+    cache = llm_cache.ResponseCache(path=str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(llm_cache, "_response_cache", cache)
+    return cache
+
+
+def generate(model, num_questions=3, output_format="MCQ"):
+    return paper_generator.generate_questions_from_pdf(
+        [], num_questions, output_format, "", "", "", raw_text="Plants take in carbon dioxide.",
+        model=model, corpus="test", use_cache=True
+    )
+
+
+def test_invalid_response_is_reasked_from_the_model(response_cache):
+    model = InvalidMCQModel()
+    assert generate(model) == []
+    assert model.calls == paper_generator.MAX_REASKS + 1
+    assert response_cache.hits == 0
+    # Nothing was cached, so regenerating asks the model again
+    generate(model)
+    assert model.calls == 2 * (paper_generator.MAX_REASKS + 1)
+
+
+def test_valid_response_is_served_from_the_cache():
+    model = FakeChatModel()
+    assert len(generate(model)) == 3
+    assert len(generate(model)) == 3
+    assert model.calls == 1
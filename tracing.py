@@ -0,0 +1,207 @@
+"""Lightweight in-process tracing.
+
+Stages are wrapped in spans:
+
+    with span("extract", files=2) as s:
+        ...
+        s.set(pages=120)
+
+Spans nest through contextvars. Work handed to another thread keeps its
+parent when the callable is wrapped with bind(). Root spans started after
+set_session() carry that session's id, so a session can list only its own
+traces. Finished spans are kept in
+memory for the debug panel. Setting PAPERMAKER_TRACE_LOG to a path also
+appends them to a JSON-lines log there, rotated to <path>.1 once it
+passes PAPERMAKER_TRACE_LOG_MB.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# Off unless a path is given
+TRACE_LOG = os.getenv("PAPERMAKER_TRACE_LOG", "")
+TRACE_LOG_MAX_BYTES = int(float(os.getenv("PAPERMAKER_TRACE_LOG_MB", "50")) * 1024 * 1024)
+# Finished spans kept in memory for the debug panel
+MAX_RECENT_SPANS = int(os.getenv("PAPERMAKER_TRACE_SPANS", "5000"))
+
+_current = contextvars.ContextVar("papermaker_span", default=None)
+_session = contextvars.ContextVar("papermaker_session", default=None)
+_recent = deque(maxlen=MAX_RECENT_SPANS)
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, parent=None, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent is not None else self.id
+        self.parent_id = parent.id if parent is not None else None
+        self.name = name
+        self.attrs = attrs
+        if parent is None and _session.get() is not None:
+            self.attrs.setdefault("session_id", _session.get())
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self._started = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def finish(self, error=None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _record(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+def _record(finished):
+    with _lock:
+        _recent.append(finished)
+    if not TRACE_LOG:
+        return
+    line = json.dumps(finished.to_dict(), default=str) + "\n"
+    try:
+        with _log_lock:
+            if os.path.exists(TRACE_LOG) and os.path.getsize(TRACE_LOG) >= TRACE_LOG_MAX_BYTES:
+                os.replace(TRACE_LOG, TRACE_LOG + ".1")
+            with open(TRACE_LOG, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError:
+        # Tracing must never break the traced work
+        pass
+
+
+def set_session(session_id):
+    """Tag root spans started from the current context with session_id."""
+    _session.set(session_id)
+
+
+def start_span(name, **attrs):
+    """Start a child of the current span without making it current.
+
+    Meant for generators, which may be resumed from another context; call
+    finish() on the result when done.
+    """
+    return Span(name, _current.get(), **attrs)
+
+
+@contextmanager
+def span(name, **attrs):
+    current = Span(name, _current.get(), **attrs)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.finish()
+
+
+def record_span(name, duration, **attrs):
+    """Record an already measured span under the current one."""
+    finished = Span(name, _current.get(), **attrs)
+    finished.duration = duration
+    _record(finished)
+    return finished
+
+
+def current_span():
+    return _current.get()
+
+
+def annotate(**attrs):
+    current = _current.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def count(key, amount=1):
+    current = _current.get()
+    if current is not None:
+        current.add(key, amount)
+
+
+def bind(fn):
+    """Wrap fn to run in a copy of the caller's context, so spans opened on
+    another thread nest under the caller's current span."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def token_counts(prompt, response_text, response=None):
+    """Prompt and response token counts, from the API's usage data when present."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return {"prompt_tokens": usage["input_tokens"], "response_tokens": usage.get("output_tokens", 0)}
+    from context_builder import estimate_tokens
+    return {
+        "prompt_tokens": estimate_tokens(str(prompt)),
+        "response_tokens": estimate_tokens(response_text) if response_text else 0,
+        "tokens_estimated": True,
+    }
+
+
+def recent_traces(limit=10, session_id=None):
+    """The latest finished traces as lists of (depth, span) in tree order, newest first.
+
+    With session_id, only traces whose root span carries that session id.
+    """
+    with _lock:
+        spans = list(_recent)
+    by_trace = {}
+    for item in spans:
+        by_trace.setdefault(item.trace_id, []).append(item)
+    roots = [item for item in spans if item.parent_id is None
+             and (session_id is None or item.attrs.get("session_id") == session_id)]
+    traces = []
+    for root in reversed(roots[-limit:]):
+        children = {}
+        for item in by_trace[root.trace_id]:
+            children.setdefault(item.parent_id, []).append(item)
+        ordered = []
+
+        def walk(node, depth):
+            ordered.append((depth, node))
+            for child in sorted(children.get(node.id, []), key=lambda c: c.start):
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        traces.append(ordered)
+    return traces
+
+
+def trace_totals(trace):
+    """Sum token counts, cache hits and retries over the spans of one trace."""
+    totals = {"prompt_tokens": 0, "response_tokens": 0, "llm_calls": 0, "cache_hits": 0, "retries": 0}
+    for _, item in trace:
+        totals["prompt_tokens"] += item.attrs.get("prompt_tokens", 0)
+        totals["response_tokens"] += item.attrs.get("response_tokens", 0)
+        totals["retries"] += item.attrs.get("retries", 0)
+        if item.name.startswith("llm."):
+            totals["cache_hits" if item.attrs.get("cache_hit") else "llm_calls"] += 1
+    return totals
@@ -0,0 +1,159 @@
+import hashlib
+import mmap
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from cache_config import cache_dir
+
+# Uploaded PDFs are kept on disk by content hash, shared by every session
+UPLOAD_ROOT = os.getenv("PAPERMAKER_UPLOAD_DIR") or cache_dir("uploads")
+UPLOAD_QUOTA_BYTES = int(float(os.getenv("PAPERMAKER_UPLOAD_QUOTA_MB", "4096")) * 1024 * 1024)
+COPY_CHUNK_SIZE = 1024 * 1024
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadStore:
+    """Content-addressed store for uploaded files with a disk quota.
+
+    Files are written once under <root>/<aa>/<sha256>.pdf. Each use bumps
+    the file's mtime, and the least recently used files are removed when
+    the store grows past its quota. Pinned files are never removed.
+    """
+
+    def __init__(self, root=UPLOAD_ROOT, quota=UPLOAD_QUOTA_BYTES):
+        self.root = root
+        self.quota = quota
+        self._lock = threading.Lock()
+        self._pinned = Counter()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], f"{digest}.pdf")
+
+    def digest_for_path(self, path):
+        """The digest of a path inside this store, or None for other paths."""
+        path = os.path.abspath(path)
+        name, ext = os.path.splitext(os.path.basename(path))
+        if ext == ".pdf" and DIGEST_RE.match(name) and os.path.dirname(os.path.dirname(path)) == os.path.abspath(self.root):
+            return name
+        return None
+
+    def put(self, upload):
+        """Copy an uploaded file (file-like object or bytes) into the store; returns its digest."""
+        if isinstance(upload, (bytes, bytearray, memoryview)):
+            chunks = [bytes(upload)]
+        else:
+            upload.seek(0)
+            chunks = iter(lambda: upload.read(COPY_CHUNK_SIZE), b"")
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f"upload.{os.getpid()}.{threading.get_ident()}.tmp")
+        hasher = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+            digest = hasher.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                self.touch(digest)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        finally:
+            if not isinstance(upload, (bytes, bytearray, memoryview)):
+                upload.seek(0)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self.pinned([digest]):
+            self.evict()
+        return digest
+
+    def touch(self, digest):
+        try:
+            os.utime(self.path(digest))
+        except OSError:
+            pass
+
+    def paths(self, digests):
+        """Paths for stored digests, marking them recently used.
+
+        Raises FileNotFoundError if one was evicted, so callers can ask for
+        the upload again.
+        """
+        paths = []
+        for digest in digests:
+            path = self.path(digest)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Upload {digest[:12]} is no longer stored; please upload it again")
+            self.touch(digest)
+            paths.append(path)
+        return paths
+
+    @contextmanager
+    def pinned(self, digests):
+        """Keep the given files from being evicted while the block runs."""
+        with self._lock:
+            self._pinned.update(digests)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pinned.subtract(digests)
+                self._pinned += Counter()
+
+    def _entries(self):
+        entries = []
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                name, ext = os.path.splitext(entry.name)
+                if ext != ".pdf" or not DIGEST_RE.match(name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name, entry.path))
+        return entries
+
+    def total_size(self):
+        return sum(size for _, size, _, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used files until the store fits its quota; returns the removed digests."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _, _ in entries)
+            removed = []
+            for _, size, digest, path in entries:
+                if total <= self.quota:
+                    break
+                if self._pinned[digest]:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed.append(digest)
+            return removed
+
+
+@contextmanager
+def open_mapped(path):
+    """Memory-map a file read-only; empty files yield b""."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+upload_store = UploadStore()
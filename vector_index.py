@@ -0,0 +1,103 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+from cache_config import cache_dir
+
+EMBEDDING_MODEL = "models/embedding-001"
+# Number of chunks sent per embedding request
+EMBED_BATCH_SIZE = int(os.getenv("PAPERMAKER_EMBED_BATCH_SIZE", "32"))
+
+
+def chunk_id(text, model_name=EMBEDDING_MODEL):
+    # Content address of a chunk: the same text under a different model is a different vector
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed store of embedding vectors, keyed by chunk_id."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir("embeddings"), "embeddings.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, vectors):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in vectors.items()]
+            )
+            self._conn.commit()
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
+
+
+def index_chunks(vector_store, text_chunks, embeddings, model_name=EMBEDDING_MODEL,
+                 batch_size=EMBED_BATCH_SIZE, cache=None):
+    """Add text_chunks to a Chroma store without duplicates.
+
+    Chunks already in the collection are skipped, cached vectors are reused
+    and only the remaining chunks are embedded, batch_size at a time.
+    Returns the number of embedding calls made.
+    """
+    unique = OrderedDict()
+    for text in text_chunks:
+        unique.setdefault(chunk_id(text, model_name), text)
+    if not unique:
+        return 0
+    collection = vector_store._collection
+    ids = list(unique)
+    existing = set(collection.get(ids=ids, include=[])["ids"])
+    missing = [key for key in ids if key not in existing]
+    if not missing:
+        return 0
+
+    cache = cache or get_embedding_cache()
+    vectors = cache.get_many(missing)
+    to_embed = [key for key in missing if key not in vectors]
+    calls = 0
+    for start in range(0, len(to_embed), batch_size):
+        batch = to_embed[start:start + batch_size]
+        new_vectors = dict(zip(batch, embeddings.embed_documents([unique[key] for key in batch])))
+        calls += 1
+        cache.put_many(new_vectors)
+        vectors.update(new_vectors)
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        collection.add(
+            ids=batch,
+            embeddings=[vectors[key] for key in batch],
+            documents=[unique[key] for key in batch]
+        )
+    return calls